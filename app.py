@@ -7,13 +7,10 @@ st.set_page_config(page_title=_("app_title"), page_icon="🛒")
 
 # ------------------------------------------------------------------
 # Imports *after* page_config
+# (only what the sign-in screen needs; DB layer, pandas, pycountry and
+#  the page modules are imported inside main() once they are used)
 # ------------------------------------------------------------------
 from sup_signin import sign_in_with_google
-from sidebar import render_sidebar                      # sidebar returns "home" / "pos" / "dash"
-from supplier.supplier_handler import get_or_create_supplier
-from home import show_home_page
-from purchase_order.main_po import show_main_po_page
-from supplier.supplier import show_supplier_dashboard
 
 # Optional RTL support (Sorani Kurdish)
 if is_rtl():
@@ -30,20 +27,41 @@ def main() -> None:
     if not user_info:
         st.stop()
 
-    # Supplier record
-    supplier = get_or_create_supplier(user_info["email"])
+    from db_handler import get_db, start_query_recording
+    from debug_panel import render_query_debug_panel
+    from supplier.supplier import current_supplier
+    from purchase_order.po_handler import get_po_status_summary
+    from sidebar import STATE_KEY as NAV_STATE, render_sidebar   # "home" / "pos" / "dash"
+
+    recorder = start_query_recording()  # per-run query stats (debug panel)
+
+    # Supplier record (one upsert per session, then session-cached)
+    supplier = current_supplier(user_info["email"])
+
+    # Independent reads go out together: sidebar badge + PO page data
+    db = get_db()
+    po_summary = db.submit(get_po_status_summary, supplier["supplierid"])
+    track_prefetch = None
+    if st.session_state.get(NAV_STATE) == "pos":
+        from purchase_order.track_po import prefetch_track_po
+        track_prefetch = prefetch_track_po(supplier)
 
     # Sidebar navigation
-    nav = render_sidebar(supplier)      # "home" | "pos" | "dash"
+    nav = render_sidebar(supplier, po_summary)      # "home" | "pos" | "dash"
 
-    # Router
+    # Router (page modules load on first visit)
     if nav == "home":
+        from home import show_home_page
         show_home_page()
     elif nav == "pos":
-        show_main_po_page(supplier)
+        from purchase_order.main_po import show_main_po_page
+        show_main_po_page(supplier, track_prefetch)
     else:  # "dash"
+        from supplier.supplier import show_supplier_dashboard
         show_supplier_dashboard(supplier)
 
+    render_query_debug_panel(recorder)  # no-op unless enabled
+
 
 if __name__ == "__main__":
     main()
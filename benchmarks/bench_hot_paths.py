@@ -0,0 +1,234 @@
+"""
+benchmarks/bench_hot_paths.py
+Time the po_handler / supplier_handler hot paths and the two PO pages
+(rendered headlessly through Streamlit's AppTest) against a seeded LOCAL
+PostgreSQL.  Reports wall time, query count / DB round trips and peak
+Python memory per case.
+
+    python benchmarks/bench_hot_paths.py --dsn postgresql://localhost/amas_bench \
+        --reset --suppliers 5 --pos-per-supplier 300 --items-per-po 40
+
+`--no-seed` reuses an already seeded database; `--json FILE` saves the
+results so two runs can be diffed for regressions.  Caches (read cache,
+thumbnails, summaries, city index) are cleared before every repetition
+unless `--warm` is given.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import pathlib
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = pathlib.Path(__file__).resolve().parent
+ROOT = HERE.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(HERE))
+
+from seed import BENCH_EMAIL, add_seed_args, apply_schema, seed, seed_opts
+
+# ───────────────────────────────────────────────────────────────
+# Environment: st.secrets is resolved against the cwd at import time, so
+# point it at a throw-away secrets.toml BEFORE streamlit is imported.
+# ───────────────────────────────────────────────────────────────
+def install_bench_secrets(dsn: str, extra: str = "") -> str:
+    tmp = tempfile.mkdtemp(prefix="amas_bench_")
+    (pathlib.Path(tmp) / ".streamlit").mkdir()
+    (pathlib.Path(tmp) / ".streamlit" / "secrets.toml").write_text(
+        f"[neon]\ndsn = {json.dumps(dsn)}\n{extra}"
+    )
+    os.chdir(tmp)
+    return tmp
+
+def quiet_streamlit() -> None:
+    """Drop the "missing ScriptRunContext" warnings of bare-mode calls."""
+    from streamlit.runtime.scriptrunner_utils import script_run_context
+    # a filter, not a level: AppTest re-applies the configured log level
+    script_run_context._LOGGER.addFilter(
+        lambda record: "ScriptRunContext" not in record.getMessage())
+
+def reset_caches(supplier_id: int) -> None:
+    from db_handler import get_db
+    from purchase_order import po_handler
+    from purchase_order.item_pictures import thumbnail_cache
+    from supplier import supplier_handler
+
+    get_db().cache.clear()
+    thumbnail_cache.clear()
+    po_handler.invalidate_po_summary(supplier_id)
+    supplier_handler._city_index.cache_clear()
+
+# ───────────────────────────────────────────────────────────────
+# Page renders (AppTest runs these functions as standalone scripts)
+# ───────────────────────────────────────────────────────────────
+def _track_page_script(root, supplier, open_ids):
+    import sys
+    sys.path.insert(0, root)
+    import streamlit as st
+    from purchase_order.track_po import show_purchase_orders_page
+    for poid in open_ids:
+        st.session_state.setdefault(f"open_{poid}", True)
+    show_purchase_orders_page(supplier)
+
+def _archived_page_script(root, supplier, open_ids):
+    import sys
+    sys.path.insert(0, root)
+    import streamlit as st
+    from purchase_order.archived_po import show_archived_po_page
+    for poid in open_ids:
+        st.session_state.setdefault(f"arch_open_{poid}", True)
+    show_archived_po_page(supplier)
+
+def render(script, supplier, open_ids):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_function(script, default_timeout=300,
+                               args=(str(ROOT), supplier, open_ids))
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+
+# ───────────────────────────────────────────────────────────────
+# Measurement
+# ───────────────────────────────────────────────────────────────
+class QueryCounter:
+    """DatabaseManager hook: counts events (also from AppTest's thread)."""
+
+    def __init__(self):
+        self.queries = self.round_trips = 0
+
+    def __call__(self, event):
+        self.queries += 1
+        self.round_trips += not event["cached"]
+
+def measure(name, fn, reps, before, counter) -> dict:
+    times = []
+    for _ in range(reps):
+        before()
+        counter.queries = counter.round_trips = 0
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    queries, round_trips = counter.queries, counter.round_trips
+
+    before()                           # separate pass: tracemalloc is slow
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"case": name, "reps": reps,
+            "median_ms": round(statistics.median(times) * 1000, 2),
+            "min_ms": round(min(times) * 1000, 2),
+            "queries": queries, "round_trips": round_trips,
+            "peak_kib": round(peak / 1024, 1)}
+
+def build_cases(supplier, country):
+    from purchase_order import po_handler as po
+    from supplier import supplier_handler as sh
+
+    sid = supplier["supplierid"]
+    active = po.get_purchase_orders_for_supplier(sid)
+    active_ids = [p["poid"] for p in active]
+    first_page, _ = po.get_archived_po_page(sid)
+    arch_ids = [p["poid"] for p in first_page]
+    one = active_ids[0] if active_ids else arch_ids[0]
+    one_items = po.get_purchase_order_items(one)
+    exp = datetime.date.today() + datetime.timedelta(days=365)
+
+    return [
+        ("po.get_purchase_orders_for_supplier",
+         lambda: po.get_purchase_orders_for_supplier(sid)),
+        ("po.get_archived_po_page (first page)",
+         lambda: po.get_archived_po_page(sid)),
+        ("po.get_archived_purchase_orders (all)",
+         lambda: po.get_archived_purchase_orders(sid)),
+        ("po.get_archived_po_page (search: item name)",
+         lambda: po.get_archived_po_page(
+             sid, search=one_items[0]["itemnameenglish"] if one_items else "x")),
+        ("po.get_archived_po_page (search: no match)",
+         lambda: po.get_archived_po_page(sid, search="zzzz")),
+        ("po.get_items_for_purchase_orders (all active)",
+         lambda: po.get_items_for_purchase_orders(active_ids)),
+        ("po.get_item_tables (all active, DataFrames)",
+         lambda: po.get_item_tables(active_ids)),
+        ("po.get_purchase_order_items (one PO)",
+         lambda: po.get_purchase_order_items(one)),
+        ("po.get_item_thumbnails (one PO)",
+         lambda: po.get_item_thumbnails(
+             (i["itemid"], i["pictureversion"]) for i in one_items)),
+        ("po.get_po_status_summary (+totals)",
+         lambda: po.get_po_status_summary(sid, with_totals=True)),
+        ("po.update_po_item_proposals (one PO)",
+         lambda: po.update_po_item_proposals(
+             one, [(i["itemid"], None, None, exp) for i in one_items],
+             "Pending")),
+        ("sh.get_or_create_supplier",
+         lambda: sh.get_or_create_supplier(supplier["contactemail"])),
+        ("sh.list_cities_for_country",
+         lambda: sh.list_cities_for_country(country)),
+        ("sh.search_cities (prefix)",
+         lambda: sh.search_cities(country, "City-01")),
+        ("page show_purchase_orders_page (all open)",
+         lambda: render(_track_page_script, supplier, active_ids)),
+        ("page show_archived_po_page (page 1 open)",
+         lambda: render(_archived_page_script, supplier, arch_ids)),
+    ]
+
+def print_table(results) -> None:
+    cols = ("case", "median_ms", "min_ms", "queries", "round_trips", "peak_kib")
+    width = max(len(r["case"]) for r in results)
+    print(f"{'case':<{width}}  {'median ms':>10} {'min ms':>9} "
+          f"{'queries':>8} {'trips':>6} {'peak KiB':>9}")
+    for r in results:
+        print(f"{r[cols[0]]:<{width}}  {r['median_ms']:>10.2f} {r['min_ms']:>9.2f} "
+              f"{r['queries']:>8} {r['round_trips']:>6} {r['peak_kib']:>9.1f}")
+
+# ───────────────────────────────────────────────────────────────
+# CLI
+# ───────────────────────────────────────────────────────────────
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    add_seed_args(ap)
+    ap.add_argument("--reset", action="store_true",
+                    help="drop and recreate the benchmark tables")
+    ap.add_argument("--no-seed", action="store_true",
+                    help="reuse the data already in --dsn")
+    ap.add_argument("--reps", type=int, default=5)
+    ap.add_argument("--warm", action="store_true",
+                    help="keep caches between repetitions")
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args()
+
+    import psycopg2
+    conn = psycopg2.connect(args.dsn)
+    try:
+        if not args.no_seed:
+            apply_schema(conn, reset=args.reset)
+            print("seeded:", seed(conn, **seed_opts(args))["counts"])
+    finally:
+        conn.close()
+
+    install_bench_secrets(args.dsn)
+    import streamlit  # noqa: F401  (after the secrets are in place)
+    quiet_streamlit()
+    from db_handler import get_db
+    from supplier import supplier_handler as sh
+
+    supplier = sh.get_or_create_supplier(BENCH_EMAIL.format(n=0))
+    counter = QueryCounter()
+    get_db().add_hook(counter)
+
+    before = (lambda: None) if args.warm else (
+        lambda: reset_caches(supplier["supplierid"]))
+    results = [measure(name, fn, args.reps, before, counter)
+               for name, fn in build_cases(supplier, supplier["country"])]
+    print_table(results)
+    if args.json:
+        pathlib.Path(args.json).write_text(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
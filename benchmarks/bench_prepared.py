@@ -0,0 +1,128 @@
+"""
+benchmarks/bench_prepared.py
+Compare the registered hot statements run as PREPARE/EXECUTE against the
+same SQL sent ad hoc through `cur.execute`, on a seeded LOCAL PostgreSQL.
+
+    python benchmarks/bench_prepared.py --dsn postgresql://localhost/amas_bench \
+        --no-seed --calls 2000 --rounds 5
+
+Both modes go through DatabaseManager (read cache bypassed) and only differ
+in `use_prepared`; rounds alternate the modes so drift hits both equally.
+Reports the median per-call latency of each mode and the speed-up.
+"""
+
+import argparse
+import json
+import pathlib
+import random
+import statistics
+import sys
+import time
+
+HERE = pathlib.Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE))
+
+from seed import BENCH_EMAIL, add_seed_args, apply_schema, seed, seed_opts
+from bench_hot_paths import install_bench_secrets, quiet_streamlit
+
+# ───────────────────────────────────────────────────────────────
+# Cases: statement name → (db method, params factory)
+# ───────────────────────────────────────────────────────────────
+def build_cases(db, rng):
+    from purchase_order import po_handler as po
+    from supplier import supplier_handler as sh
+
+    supplier = sh.get_or_create_supplier(BENCH_EMAIL.format(n=0))
+    sid, country = supplier["supplierid"], supplier["country"]
+    poids = [p["poid"] for p in po.get_purchase_orders_for_supplier(sid)] or [0]
+    email = supplier["contactemail"]
+
+    def returning(stmt, params):
+        return db.execute(stmt, params, returning=True, invalidates=())
+
+    return {
+        "po_by_id":               (db.fetch, lambda: (rng.choice(poids),)),
+        "po_active_for_supplier": (db.fetch, lambda: (sid,)),
+        "po_items_for_pos":       (db.fetch, lambda: (rng.sample(poids, min(3, len(poids))),)),
+        "supplier_by_email":      (db.fetch, lambda: (email,)),
+        "cities_by_country":      (db.fetch, lambda: (country,)),
+        "supplier_get_or_create": (returning, lambda: ("", email, email)),
+    }
+
+def time_calls(call, stmt, make_params, calls) -> float:
+    """Seconds per call over `calls` sequential calls."""
+    params = [make_params() for _ in range(calls)]
+    t0 = time.perf_counter()
+    for p in params:
+        call(stmt, p)
+    return (time.perf_counter() - t0) / calls
+
+def run(db, cases, calls, rounds) -> list:
+    from db_handler import registered_statements
+
+    stmts = registered_statements()
+    results = []
+    for name, (call, make_params) in cases.items():
+        stmt = stmts[name]
+        samples = {False: [], True: []}
+        for mode in (False, True):                     # warm-up, incl. PREPARE
+            db.use_prepared = mode
+            time_calls(call, stmt, make_params, max(calls // 20, 10))
+        for r in range(rounds):
+            for mode in ((False, True) if r % 2 == 0 else (True, False)):
+                db.use_prepared = mode
+                samples[mode].append(time_calls(call, stmt, make_params, calls))
+        adhoc = statistics.median(samples[False]) * 1e6
+        prepared = statistics.median(samples[True]) * 1e6
+        results.append({"statement": name, "calls": calls, "rounds": rounds,
+                        "adhoc_us": round(adhoc, 1), "prepared_us": round(prepared, 1),
+                        "speedup": round(adhoc / prepared, 2) if prepared else None})
+    db.use_prepared = True
+    return results
+
+def print_table(results) -> None:
+    width = max(len(r["statement"]) for r in results)
+    print(f"{'statement':<{width}}  {'ad hoc µs':>10} {'prepared µs':>12} {'speed-up':>9}")
+    for r in results:
+        print(f"{r['statement']:<{width}}  {r['adhoc_us']:>10.1f} "
+              f"{r['prepared_us']:>12.1f} {r['speedup']:>8.2f}x")
+
+# ───────────────────────────────────────────────────────────────
+# CLI
+# ───────────────────────────────────────────────────────────────
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    add_seed_args(ap)
+    ap.add_argument("--reset", action="store_true",
+                    help="drop and recreate the benchmark tables")
+    ap.add_argument("--no-seed", action="store_true",
+                    help="reuse the data already in --dsn")
+    ap.add_argument("--calls", type=int, default=1000, help="calls per round")
+    ap.add_argument("--rounds", type=int, default=5)
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args()
+
+    if not args.no_seed:
+        import psycopg2
+        conn = psycopg2.connect(args.dsn)
+        try:
+            apply_schema(conn, reset=args.reset)
+            print("seeded:", seed(conn, **seed_opts(args))["counts"])
+        finally:
+            conn.close()
+
+    install_bench_secrets(args.dsn, "pool_max = 1\n")   # one conn: no pool noise
+    import streamlit  # noqa: F401  (after the secrets are in place)
+    quiet_streamlit()
+    from db_handler import get_db
+
+    db = get_db()
+    results = run(db, build_cases(db, random.Random(args.seed or 42)),
+                  args.calls, args.rounds)
+    print_table(results)
+    if args.json:
+        pathlib.Path(args.json).write_text(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
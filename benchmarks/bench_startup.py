@@ -0,0 +1,110 @@
+"""
+benchmarks/bench_startup.py
+Cold-start benchmark: fresh interpreter → app.py rendered up to the
+sign-in screen (headless, via Streamlit's AppTest).
+
+Reports wall time, which heavy modules got imported and how many database
+connections were opened before anyone signed in.  `--ref REV` runs the
+same measurement against another git revision for comparison.
+
+    python benchmarks/bench_startup.py [--runs 7] [--ref baseline-rev]
+"""
+
+import argparse
+import json
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+HEAVY = ("pandas", "numpy", "PIL", "pycountry", "psycopg2", "pyarrow")
+
+# Dummy secrets; the [auth] section makes st.user report is_logged_in=False.
+_SECRETS = """
+[neon]
+dsn = "postgresql://bench@localhost/bench"
+
+[auth]
+redirect_uri = "http://localhost:8501/oauth2callback"
+cookie_secret = "bench"
+"""
+
+# Runs in a fresh interpreter (cwd = temp dir holding .streamlit/secrets.toml).  Streamlit itself is imported before the
+# clock starts – every variant pays that cost equally.
+_CHILD = r"""
+import json, sys, time
+sys.path.insert(0, {root!r})
+from streamlit.testing.v1 import AppTest
+
+opened = []
+try:
+    import psycopg2
+    class _NoDB:
+        closed = 0
+        def __getattr__(self, name):
+            raise RuntimeError("benchmark: no database")
+    def _connect(*a, **k):
+        opened.append(1)
+        return _NoDB()
+    psycopg2.connect = _connect
+except ImportError:
+    pass
+preloaded = set(sys.modules)
+
+t0 = time.perf_counter()
+at = AppTest.from_file({app!r}, default_timeout=120)
+at.run()
+elapsed = time.perf_counter() - t0
+
+print(json.dumps({{
+    "seconds": elapsed,
+    "signin_shown": any(b.label for b in at.button),
+    "errors": [e.value for e in at.exception],
+    "heavy": sorted(m for m in {heavy!r}
+                    if m in sys.modules and m not in preloaded),
+    "connections": len(opened),
+}}))
+"""
+
+def _measure(tree: pathlib.Path, runs: int) -> dict:
+    code = _CHILD.format(root=str(tree), app=str(tree / "app.py"), heavy=HEAVY)
+    samples = []
+    with tempfile.TemporaryDirectory() as cwd:
+        (pathlib.Path(cwd) / ".streamlit").mkdir()
+        (pathlib.Path(cwd) / ".streamlit" / "secrets.toml").write_text(_SECRETS)
+        for _ in range(runs):
+            out = subprocess.run([sys.executable, "-c", code], cwd=cwd,
+                                 capture_output=True, text=True, check=True)
+            samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    last = samples[-1]
+    secs = sorted(s["seconds"] for s in samples)
+    return {"median_s": statistics.median(secs), "min_s": secs[0],
+            "signin_shown": last["signin_shown"], "errors": last["errors"],
+            "heavy": last["heavy"], "connections": last["connections"]}
+
+def _report(label: str, r: dict) -> None:
+    print(f"{label:<10} median {r['median_s'] * 1000:7.1f} ms   "
+          f"min {r['min_s'] * 1000:7.1f} ms   "
+          f"db connects {r['connections']}   "
+          f"heavy imports {', '.join(r['heavy']) or '-'}")
+    if not r["signin_shown"] or r["errors"]:
+        print(f"{'':<10} ! sign-in screen not reached: {r['errors']}")
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--runs", type=int, default=7)
+    ap.add_argument("--ref", help="git revision to compare against")
+    args = ap.parse_args()
+
+    if args.ref:
+        with tempfile.TemporaryDirectory() as tmp:
+            archive = subprocess.run(["git", "archive", args.ref], cwd=ROOT,
+                                     capture_output=True, check=True).stdout
+            subprocess.run(["tar", "-x", "-C", tmp], input=archive, check=True)
+            _report(args.ref[:10], _measure(pathlib.Path(tmp), args.runs))
+    _report("worktree", _measure(ROOT, args.runs))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+benchmarks/bench_translation.py
+Micro-benchmark: legacy `_()` (st.cache_resource lookup + unconditional
+str.format per call) vs. the precompiled catalogs in `translation`.
+
+    python benchmarks/bench_translation.py [--calls 200000] [--lang en]
+"""
+
+import argparse
+import json
+import logging
+import pathlib
+import sys
+import timeit
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import streamlit as st
+import translation
+from translation import TRANSL_DIR, get_language
+
+# bare mode (no `streamlit run`) logs a warning per session_state access
+for name in list(logging.root.manager.loggerDict):
+    if name.startswith("streamlit"):
+        logging.getLogger(name).setLevel(logging.ERROR)
+
+# ───────────────────────────────────────────────────────────────
+# Legacy implementation, kept verbatim for comparison
+# ───────────────────────────────────────────────────────────────
+@st.cache_resource(show_spinner=False)
+def _legacy_load_dict(lang: str) -> dict:
+    file = TRANSL_DIR / f"{lang}.json"
+    return json.loads(file.read_text(encoding="utf8"))
+
+def legacy_(key: str, **fmt) -> str:
+    lang = get_language()
+    dictionary = _legacy_load_dict(lang)
+    text = dictionary.get(key, key)
+    return text.format(**fmt)
+
+def legacy_is_rtl() -> bool:
+    rtl_codes = (TRANSL_DIR / "rtl_langs.txt").read_text().split()
+    return get_language() in rtl_codes
+
+# ───────────────────────────────────────────────────────────────
+# The mix one Track PO card issues per render
+# ───────────────────────────────────────────────────────────────
+CALLS = (
+    ("po_expander",        {"id": 42, "status": "Pending"}),
+    ("order_date",         {"date": "2024-01-01"}),
+    ("expected_delivery",  {"date": "2024-01-09"}),
+    ("current_status",     {"status": "Pending"}),
+    ("not_set",            {}),
+    ("show_details",       {}),
+    ("accept_order_btn",   {}),
+    ("modify_order_btn",   {}),
+    ("decline_order_btn",  {}),
+    ("item_label",         {"id": 7, "name": "Widget"}),
+    ("qty_label",          {}),
+    ("price_label",        {}),
+)
+
+def _run(fn, n):
+    per_round = len(CALLS)
+    rounds = max(n // per_round, 1)
+
+    def body():
+        for key, fmt in CALLS:
+            fn(key, **fmt)
+    best = min(timeit.repeat(body, number=rounds, repeat=5))
+    return rounds * per_round / best
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--calls", type=int, default=200_000)
+    ap.add_argument("--lang", default="en")
+    args = ap.parse_args()
+
+    translation.set_language(args.lang)
+    for key, fmt in CALLS:                         # same output, warm caches
+        assert legacy_(key, **fmt) == translation._(key, **fmt), key
+
+    old = _run(legacy_, args.calls)
+    new = _run(translation._, args.calls)
+    print(f"_()      legacy : {old:>12,.0f} calls/s")
+    print(f"_()      catalog: {new:>12,.0f} calls/s   ({new / old:.1f}x)")
+
+    n = 2_000
+    old_rtl = n / min(timeit.repeat(legacy_is_rtl, number=n, repeat=5))
+    new_rtl = n / min(timeit.repeat(translation.is_rtl, number=n, repeat=5))
+    print(f"is_rtl() legacy : {old_rtl:>12,.0f} calls/s")
+    print(f"is_rtl() cached : {new_rtl:>12,.0f} calls/s   ({new_rtl / old_rtl:.1f}x)")
+
+if __name__ == "__main__":
+    main()
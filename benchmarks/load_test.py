@@ -0,0 +1,347 @@
+"""
+benchmarks/load_test.py
+Drive N simulated supplier sessions in parallel against a seeded LOCAL
+PostgreSQL and report rerun latency percentiles and throughput.
+
+    python benchmarks/load_test.py --dsn postgresql://localhost/amas_bench \
+        --reset --suppliers 10 --pos-per-supplier 300 \
+        --sessions 32 --duration 60 --pool-max 1
+
+Every session is a thread that replays the flows of a real supplier tab:
+open Track PO, expand a PO, Accept with expiration dates, Modify, Decline,
+browse the archive and load more.  Each step performs exactly the handler
+calls of the Streamlit rerun it stands for (full page run or one card
+fragment), and all sessions share the one process-wide DatabaseManager –
+just like tabs served by one `streamlit run` process.  Widget rendering is
+left out on purpose; bench_hot_paths.py times that single-session.
+
+`--pool-max` overrides `pool_max` from the secrets, so `--pool-max 1`
+reproduces a single shared connection and can be compared with a wider
+pool.  Accept / Modify / Decline really write: reseed (`--reset`) between
+runs that should be compared.
+"""
+
+import argparse
+import collections
+import datetime
+import json
+import logging
+import pathlib
+import random
+import statistics
+import sys
+import threading
+import time
+
+HERE = pathlib.Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+sys.path.insert(0, str(HERE))
+
+from seed import BENCH_EMAIL, add_seed_args, apply_schema, seed, seed_opts
+from bench_hot_paths import install_bench_secrets, quiet_streamlit
+from purchase_order.item_grid import grid_changes, proposal_grid
+
+# step name → relative weight in the flow mix
+FLOW_MIX = {
+    "open_track":   4,
+    "expand_po":    6,
+    "accept_po":    2,
+    "modify_po":    2,
+    "decline_po":   1,
+    "open_archive": 2,
+    "load_more":    1,
+}
+
+# ───────────────────────────────────────────────────────────────
+# One simulated supplier session
+# ───────────────────────────────────────────────────────────────
+class Session:
+    """
+    Mirrors the session_state a supplier tab keeps (loaded POs, opened
+    cards, archive window) and turns every step into the handler calls
+    of the matching rerun.  A step returns False when it had nothing to
+    act on (e.g. no Pending PO left) and is then not timed.
+    """
+
+    def __init__(self, email: str, rng: random.Random):
+        from supplier.supplier_handler import get_or_create_supplier
+
+        self.rng = rng
+        self.supplier = get_or_create_supplier(email)   # sign-in rerun
+        self.sid = self.supplier["supplierid"]
+        self.pos: dict = {}              # track_po_rows
+        self.items: dict = {}            # track_po_items (opened cards' tables)
+        self.window = None               # archived_po_window
+
+    # ---------- full-page reruns ----------
+    def open_track(self):
+        from purchase_order import po_handler as po
+
+        po.get_po_status_summary(self.sid)                       # sidebar
+        self.pos = {p["poid"]: p for p in po.get_purchase_orders_for_supplier(self.sid)}
+        tables = po.get_item_tables(list(self.items))
+        self.items = {poid: tables.get(poid) for poid in self.items
+                      if poid in self.pos}
+
+    def open_archive(self):
+        from purchase_order import po_handler as po
+
+        po.get_po_status_summary(self.sid)
+        rows, cursor = po.get_archived_po_page(self.sid)
+        self.window = {"rows": rows, "cursor": cursor}
+        opened = [p["poid"] for p in rows[:2]]
+        po.get_item_tables(opened)
+
+    # ---------- fragment / callback reruns ----------
+    def load_more(self):
+        from purchase_order import po_handler as po
+
+        if not self.window or self.window["cursor"] is None:
+            return self.open_archive()
+        rows, cursor = po.get_archived_po_page(self.sid, self.window["cursor"])
+        self.window["rows"].extend(rows)
+        self.window["cursor"] = cursor
+
+    def expand_po(self):
+        from purchase_order import po_handler as po
+
+        poid = self._pick()
+        if poid is None:
+            return False
+        self.items[poid] = po.get_item_tables([poid]).get(poid)
+
+    def accept_po(self):
+        from purchase_order import po_handler as po
+
+        poid = self._pick("Pending", opened=True)
+        if poid is None:
+            return False
+        table = self.items[poid]
+        changes = []
+        if table is not None:                                        # grid submit
+            base = proposal_grid(table)
+            edited = base.assign(Expiration=datetime.date.today()
+                                 + datetime.timedelta(days=self.rng.randint(30, 720)))
+            changes = grid_changes(base, edited, ("Expiration",),
+                                   force={"Expiration": table["SupExpDate"].isna()})
+        written = po.update_po_item_proposals(
+            poid, changes, "Accepted",
+            expected_delivery=datetime.datetime.now() + datetime.timedelta(days=7),
+        )
+        self._refresh(poid, *written)
+
+    def modify_po(self):
+        from purchase_order import po_handler as po
+
+        poid = self._pick("Pending", opened=True)
+        if poid is None:
+            return False
+        table = self.items[poid]
+        changes = []
+        if table is not None:                   # grid submit: a few edited lines
+            base = proposal_grid(table)
+            edited = base.copy()
+            for idx in self.rng.sample(list(base.index), min(3, len(base))):
+                edited.at[idx, "Qty"] = max(int(base.at[idx, "Qty"]) - 1, 0)
+                edited.at[idx, "Price"] = round(base.at[idx, "Price"] * 1.05, 2)
+            changes = grid_changes(base, edited)
+        written = po.update_po_item_proposals(
+            poid, changes,
+            sup_proposed_deliver=datetime.datetime.now() + datetime.timedelta(days=9),
+            supplier_note="load test proposal",
+        )
+        self._refresh(poid, *written)
+
+    def decline_po(self):
+        from purchase_order import po_handler as po
+
+        poid = self._pick("Pending")
+        if poid is None:
+            return False
+        self._refresh(poid, po.update_purchase_order_status(
+            poid, "Declined", supplier_note="load test"))
+
+    # ---------- helpers ----------
+    def _pick(self, status=None, opened=False):
+        """Random loaded PO (optionally by status); opens its card if needed."""
+        from purchase_order import po_handler as po
+
+        if not self.pos:
+            self.open_track()
+        ids = [poid for poid, p in self.pos.items()
+               if status is None or p["status"] == status]
+        if not ids:
+            return None
+        poid = self.rng.choice(ids)
+        if opened and poid not in self.items:
+            self.items[poid] = po.get_item_tables([poid]).get(poid)
+        return poid
+
+    def _refresh(self, poid, header, items=None):
+        """What `_refresh_card` does after a write: patch, don't reread."""
+        from purchase_order import po_handler as po
+
+        if header is None:
+            self.pos.pop(poid, None)
+        else:
+            self.pos[poid] = header
+        if items and poid in self.items:
+            self.items[poid] = po.patch_item_table(self.items[poid], items)
+        if header is None or header["status"] not in ("Pending", "Accepted", "Shipping"):
+            self.window = None
+
+# ───────────────────────────────────────────────────────────────
+# Runner
+# ───────────────────────────────────────────────────────────────
+class Results:
+    """Thread-safe latency sink: step → [seconds]."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = collections.defaultdict(list)
+        self.errors = collections.Counter()
+        self.skipped = collections.Counter()
+
+    def add(self, step, seconds):
+        with self._lock:
+            self.latencies[step].append(seconds)
+
+    def skip(self, step):
+        with self._lock:
+            self.skipped[step] += 1
+
+    def fail(self, step, exc):
+        with self._lock:
+            self.errors[f"{step}: {type(exc).__name__}"] += 1
+
+def run_session(n, args, results, start_gate):
+    rng = random.Random(args.seed * 1000 + n)
+    steps, weights = zip(*FLOW_MIX.items())
+    start_gate.wait()
+    deadline = time.monotonic() + args.duration
+    try:
+        session = Session(BENCH_EMAIL.format(n=n % args.suppliers), rng)
+        session.open_track()
+    except Exception as exc:                    # noqa: BLE001
+        results.fail("sign_in", exc)
+        return
+
+    done = 0
+    while time.monotonic() < deadline and (not args.iterations or done < args.iterations):
+        step = rng.choices(steps, weights)[0]
+        t0 = time.perf_counter()
+        try:
+            acted = getattr(session, step)()
+        except Exception as exc:                # noqa: BLE001
+            results.fail(step, exc)
+        else:
+            if acted is False:
+                results.skip(step)
+            else:
+                results.add(step, time.perf_counter() - t0)
+        done += 1
+        if args.think_ms:
+            time.sleep(rng.uniform(0, 2 * args.think_ms) / 1000)
+
+def percentiles(samples) -> dict:
+    ms = sorted(s * 1000 for s in samples)
+    if len(ms) < 2:
+        v = round(ms[0], 2) if ms else None
+        return {"p50": v, "p95": v, "p99": v}
+    q = statistics.quantiles(ms, n=100, method="inclusive")
+    return {"p50": round(q[49], 2), "p95": round(q[94], 2), "p99": round(q[98], 2)}
+
+def report(results, elapsed) -> dict:
+    rows = []
+    everything = []
+    for step in FLOW_MIX:
+        samples = results.latencies.get(step, [])
+        everything.extend(samples)
+        if samples:
+            rows.append({"step": step, "count": len(samples), **percentiles(samples)})
+    total = {"step": "ALL", "count": len(everything), **percentiles(everything)}
+    return {"elapsed_s": round(elapsed, 2),
+            "throughput_rps": round(len(everything) / elapsed, 1) if elapsed else 0.0,
+            "steps": rows + [total],
+            "skipped": dict(results.skipped),
+            "errors": dict(results.errors)}
+
+def print_report(out, pool, sessions) -> None:
+    print(f"{'step':<14} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for r in out["steps"]:
+        print(f"{r['step']:<14} {r['count']:>7} {r['p50'] or 0:>9.2f} "
+              f"{r['p95'] or 0:>9.2f} {r['p99'] or 0:>9.2f}")
+    print(f"\n{sessions} sessions, {out['elapsed_s']} s, "
+          f"{out['throughput_rps']} reruns/s")
+    print("pool:", json.dumps(pool))
+    if out["skipped"]:
+        print("skipped (nothing to act on):", json.dumps(out["skipped"]))
+    if out["errors"]:
+        print("errors:", json.dumps(out["errors"]))
+
+# ───────────────────────────────────────────────────────────────
+# CLI
+# ───────────────────────────────────────────────────────────────
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    add_seed_args(ap)
+    ap.add_argument("--reset", action="store_true",
+                    help="drop and recreate the benchmark tables")
+    ap.add_argument("--no-seed", action="store_true",
+                    help="reuse the data already in --dsn")
+    ap.add_argument("--sessions", type=int, default=16)
+    ap.add_argument("--duration", type=float, default=30.0, help="seconds")
+    ap.add_argument("--iterations", type=int, default=0,
+                    help="stop each session after this many steps (0 = no limit)")
+    ap.add_argument("--think-ms", type=float, default=0.0,
+                    help="mean pause between a session's steps")
+    ap.add_argument("--pool-max", type=int, help="override [neon] pool_max")
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args()
+
+    import psycopg2
+    conn = psycopg2.connect(args.dsn)
+    try:
+        if not args.no_seed:
+            apply_schema(conn, reset=args.reset)
+            print("seeded:", seed(conn, **seed_opts(args))["counts"])
+        with conn.cursor() as cur:
+            cur.execute("SELECT count(*) FROM supplier WHERE contactemail LIKE %s",
+                        (BENCH_EMAIL.format(n="%"),))
+            args.suppliers = cur.fetchone()[0]
+    finally:
+        conn.close()
+    if not args.suppliers:
+        sys.exit("no benchmark suppliers in the database – run without --no-seed")
+    args.seed = args.seed if args.seed is not None else 42
+
+    extra = f"pool_max = {args.pool_max}\n" if args.pool_max else ""
+    install_bench_secrets(args.dsn, extra)
+    import streamlit  # noqa: F401  (after the secrets are in place)
+    quiet_streamlit()
+    from db_handler import get_db, slow_log
+
+    slow_log.setLevel(logging.ERROR)     # contention makes every query "slow"
+
+    db = get_db()                        # build the shared manager up front
+    results = Results()
+    gate = threading.Event()             # release all sessions at once
+    threads = [threading.Thread(target=run_session, daemon=True,
+                                args=(n, args, results, gate))
+               for n in range(args.sessions)]
+    for t in threads:
+        t.start()
+    t0 = time.perf_counter()
+    gate.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    out = report(results, elapsed)
+    out.update(sessions=args.sessions, pool=db.pool_stats(), cache=db.cache_stats())
+    print_report(out, out["pool"], args.sessions)
+    if args.json:
+        pathlib.Path(args.json).write_text(json.dumps(out, indent=2, default=str))
+
+if __name__ == "__main__":
+    main()
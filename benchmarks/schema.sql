@@ -0,0 +1,54 @@
+-- benchmarks/schema.sql
+-- Minimal stand-in for the production tables, limited to the columns the
+-- app reads and writes.  Only used to seed a local benchmark database;
+-- sql/*.sql migrations are applied on top by benchmarks/seed.py.
+
+CREATE TABLE IF NOT EXISTS supplier (
+    supplierid    SERIAL PRIMARY KEY,
+    suppliername  TEXT,
+    suppliertype  TEXT,
+    country       TEXT,
+    city          TEXT,
+    address       TEXT,
+    postalcode    TEXT,
+    contactname   TEXT,
+    contactphone  TEXT,
+    contactemail  TEXT NOT NULL,
+    paymentterms  TEXT,
+    bankdetails   TEXT
+);
+
+CREATE TABLE IF NOT EXISTS Item (
+    ItemID           SERIAL PRIMARY KEY,
+    ItemNameEnglish  TEXT NOT NULL,
+    ItemPicture      BYTEA
+);
+
+CREATE TABLE IF NOT EXISTS PurchaseOrders (
+    POID                SERIAL PRIMARY KEY,
+    SupplierID          INT NOT NULL REFERENCES supplier (supplierid),
+    OrderDate           TIMESTAMP NOT NULL DEFAULT NOW(),
+    ExpectedDelivery    TIMESTAMP,
+    Status              TEXT NOT NULL DEFAULT 'Pending',
+    SupProposedDeliver  TIMESTAMP,
+    OriginalPOID        INT,
+    SupplierNote        TEXT,
+    RespondedAt         TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS PurchaseOrderItems (
+    POID                 INT NOT NULL REFERENCES PurchaseOrders (POID),
+    ItemID               INT NOT NULL REFERENCES Item (ItemID),
+    OrderedQuantity      INT NOT NULL,
+    EstimatedPrice       NUMERIC(12, 2),
+    SupProposedQuantity  INT,
+    SupProposedPrice     NUMERIC(12, 2),
+    SupExpirationDate    DATE,
+    PRIMARY KEY (POID, ItemID)
+);
+
+CREATE TABLE IF NOT EXISTS cities (
+    country  TEXT NOT NULL,
+    city     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cities_country ON cities (country);
@@ -0,0 +1,175 @@
+"""
+benchmarks/seed.py
+Seed a LOCAL PostgreSQL with a reproducible synthetic supplier / PO dataset.
+
+    python benchmarks/seed.py --dsn postgresql://localhost/amas_bench \
+        --suppliers 20 --pos-per-supplier 300 --items-per-po 40 \
+        --picture-kb 64 --cities-per-country 10000
+
+Creates the tables from benchmarks/schema.sql, applies sql/*.sql, and with
+--reset drops them first.  Never point this at production.
+"""
+
+import argparse
+import datetime
+import io
+import pathlib
+import random
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+HERE = pathlib.Path(__file__).resolve().parent
+ROOT = HERE.parent
+
+ACTIVE = ("Pending", "Accepted", "Shipping")
+ARCHIVED = ("Declined", "Declined by AMAS", "Declined by Supplier",
+            "Delivered", "Completed")
+COUNTRIES = ("Iraq", "Turkey", "Iran", "Jordan", "Syria")
+BENCH_EMAIL = "supplier{n}@bench.example"      # supplier n's login
+
+DEFAULTS = {
+    "suppliers": 5,
+    "pos_per_supplier": 100,
+    "items_per_po": 20,
+    "picture_kb": 32,
+    "cities_per_country": 2000,
+    "active_share": 0.3,
+    "seed": 42,
+}
+
+# ───────────────────────────────────────────────────────────────
+# Helpers
+# ───────────────────────────────────────────────────────────────
+def _picture(rng: random.Random, kb: int) -> bytes | None:
+    """Incompressible PNG of roughly `kb` KiB (noise pixels)."""
+    if kb <= 0:
+        return None
+    from PIL import Image
+
+    side = max(int((kb * 1024 / 3) ** 0.5), 1)
+    img = Image.frombytes("RGB", (side, side), rng.randbytes(side * side * 3))
+    buf = io.BytesIO()
+    img.save(buf, format="PNG", compress_level=1)
+    return buf.getvalue()
+
+def apply_schema(conn, reset: bool = False) -> None:
+    with conn.cursor() as cur:
+        if reset:
+            cur.execute("""
+                DROP TABLE IF EXISTS supplier_po_kpis,
+                                     PurchaseOrderItems, PurchaseOrders,
+                                     Item, cities, supplier CASCADE
+            """)
+        cur.execute((HERE / "schema.sql").read_text())
+        for migration in sorted((ROOT / "sql").glob("*.sql")):
+            cur.execute(migration.read_text())
+    conn.commit()
+
+# ───────────────────────────────────────────────────────────────
+# Seeding
+# ───────────────────────────────────────────────────────────────
+def seed(conn, **opts) -> dict:
+    """Insert the dataset; returns {"suppliers": [ids], "counts": {...}}."""
+    cfg = {**DEFAULTS, **{k: v for k, v in opts.items() if v is not None}}
+    rng = random.Random(cfg["seed"])
+    n_items = max(cfg["items_per_po"] * 4, 50)
+    pictures = [_picture(rng, cfg["picture_kb"]) for _ in range(min(n_items, 50))]
+    now = datetime.datetime(2025, 1, 1)
+
+    with conn.cursor() as cur:
+        supplier_ids = [r[0] for r in execute_values(cur, """
+            INSERT INTO supplier (suppliername, suppliertype, country, city,
+                                  address, postalcode, contactname,
+                                  contactphone, contactemail, paymentterms,
+                                  bankdetails)
+            VALUES %s RETURNING supplierid
+        """, [(f"Bench Supplier {n}", "Distributor", COUNTRIES[n % len(COUNTRIES)],
+               "City-00001", "Street 1", "44001", f"Contact {n}", "+964000000",
+               BENCH_EMAIL.format(n=n), "30 days", "IBAN 000")
+              for n in range(cfg["suppliers"])], fetch=True)]
+
+        item_ids = [r[0] for r in execute_values(cur, """
+            INSERT INTO Item (ItemNameEnglish, ItemPicture) VALUES %s
+            RETURNING ItemID
+        """, [(f"Item {i:05d} {rng.choice(('Rice', 'Flour', 'Oil', 'Sugar', 'Tea'))}",
+               psycopg2.Binary(pictures[i % len(pictures)])
+               if pictures[i % len(pictures)] else None)
+              for i in range(n_items)], fetch=True, page_size=50)]
+
+        po_rows = []
+        for sid in supplier_ids:
+            for k in range(cfg["pos_per_supplier"]):
+                active = rng.random() < cfg["active_share"]
+                status = rng.choice(ACTIVE if active else ARCHIVED)
+                ordered = now - datetime.timedelta(hours=rng.randint(1, 24 * 900))
+                responded = (ordered + datetime.timedelta(hours=rng.randint(1, 96))
+                             if status != "Pending" else None)
+                po_rows.append((sid, ordered, status, responded,
+                                f"note {k} {rng.choice(('urgent', 'bulk', 'weekly'))}"))
+        po_ids = [r[0] for r in execute_values(cur, """
+            INSERT INTO PurchaseOrders (SupplierID, OrderDate, Status,
+                                        RespondedAt, SupplierNote)
+            VALUES %s RETURNING POID
+        """, po_rows, fetch=True, page_size=1000)]
+
+        line_rows = []
+        per_po = min(cfg["items_per_po"], len(item_ids))
+        for poid in po_ids:
+            for iid in rng.sample(item_ids, per_po):
+                line_rows.append((poid, iid, rng.randint(1, 500),
+                                  round(rng.uniform(0.5, 250), 2)))
+        execute_values(cur, """
+            INSERT INTO PurchaseOrderItems (POID, ItemID, OrderedQuantity,
+                                            EstimatedPrice)
+            VALUES %s
+        """, line_rows, page_size=5000)
+
+        city_rows = [(country, f"City-{c:05d}")
+                     for country in COUNTRIES
+                     for c in range(1, cfg["cities_per_country"] + 1)]
+        execute_values(cur, "INSERT INTO cities (country, city) VALUES %s",
+                       city_rows, page_size=5000)
+        # POs were inserted directly, not via the status writers
+        cur.execute("SELECT refresh_supplier_kpis()")
+        cur.execute("ANALYZE")
+    conn.commit()
+    return {"suppliers": supplier_ids,
+            "counts": {"suppliers": len(supplier_ids), "items": len(item_ids),
+                       "pos": len(po_ids), "po_lines": len(line_rows),
+                       "cities": len(city_rows)}}
+
+# ───────────────────────────────────────────────────────────────
+# CLI
+# ───────────────────────────────────────────────────────────────
+def add_seed_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--dsn", required=True, help="LOCAL benchmark database")
+    ap.add_argument("--suppliers", type=int)
+    ap.add_argument("--pos-per-supplier", type=int)
+    ap.add_argument("--items-per-po", type=int)
+    ap.add_argument("--picture-kb", type=int)
+    ap.add_argument("--cities-per-country", type=int)
+    ap.add_argument("--seed", type=int)
+
+def seed_opts(args) -> dict:
+    return {k: getattr(args, k) for k in
+            ("suppliers", "pos_per_supplier", "items_per_po", "picture_kb",
+             "cities_per_country", "seed")}
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    add_seed_args(ap)
+    ap.add_argument("--reset", action="store_true",
+                    help="drop the benchmark tables first")
+    args = ap.parse_args()
+
+    conn = psycopg2.connect(args.dsn)
+    try:
+        apply_schema(conn, reset=args.reset)
+        result = seed(conn, **seed_opts(args))
+    finally:
+        conn.close()
+    print(result["counts"])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Repo-root conftest: makes the top-level packages importable from tests/.
@@ -1,87 +1,999 @@
 # db_handler.py
+import csv
+import hashlib
+import io
+import itertools
+import json
+import logging
+import re
+import select
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+
 import streamlit as st
 import psycopg2
-from psycopg2 import OperationalError, extensions   # ← add extensions here
+from psycopg2 import OperationalError, errors, extensions   # ← add extensions here
 from psycopg2.extras import RealDictCursor
 
+DEFAULT_POOL_MIN = 1
+DEFAULT_POOL_MAX = 10
+DEFAULT_POOL_TIMEOUT = 30.0      # seconds to wait for a free connection
+DEFAULT_CACHE_SIZE = 512         # cached SELECT results per process
+DEFAULT_CACHE_TTL = 60.0         # seconds; bounds staleness from other writers
+DEFAULT_SLOW_QUERY_MS = 500.0    # queries at/above this go to the slow log
+DEFAULT_PARALLEL_READS = 4       # worker threads for concurrent reads
+DEFAULT_PREPARED = True          # EXECUTE registered statements (see Statement)
+DEFAULT_STREAM_CHUNK = 2000      # rows per round trip for stream()
+DEFAULT_LIVE_UPDATES = False     # LISTEN for NOTIFY events (see NotifyListener)
+
+slow_log = logging.getLogger("db_handler.slow_queries")
+
 # ─────────────────────────────────────────────────────────────
-# 1. Keep one live connection per user session
+# 1. Bounded, thread-safe connection pool
 # ─────────────────────────────────────────────────────────────
-@st.cache_resource(show_spinner=False)
-def _get_conn_cached(dsn: str):
-    """Create (once) and return a live PostgreSQL connection."""
-    return psycopg2.connect(dsn, cursor_factory=RealDictCursor)
+class PoolTimeout(OperationalError):
+    """No connection became free within the pool's checkout timeout."""
+
+
+class ConnectionPool:
+    """
+    Hands out at most `maxconn` live connections.  Callers block (up to
+    `timeout` seconds) when every connection is checked out, instead of
+    sharing one socket across Streamlit sessions.
+    """
+
+    def __init__(self, dsn: str, minconn: int = DEFAULT_POOL_MIN,
+                 maxconn: int = DEFAULT_POOL_MAX,
+                 timeout: float = DEFAULT_POOL_TIMEOUT):
+        if maxconn < 1 or minconn < 0 or minconn > maxconn:
+            raise ValueError("need 0 <= minconn <= maxconn and maxconn >= 1")
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+
+        self._lock = threading.Condition()
+        self._idle: list = []          # connections ready for checkout
+        self._opened = 0               # idle + checked out
+
+        # counters exposed through stats()
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._timeouts = 0
+        self._reconnects = 0
+
+        for _ in range(minconn):
+            self._idle.append(self._connect())
+            self._opened += 1
+
+    # ---------- internals ----------
+    def _connect(self):
+        return psycopg2.connect(self.dsn, connection_factory=PreparingConnection,
+                                cursor_factory=RealDictCursor)
+
+    # ---------- public API ----------
+    def getconn(self):
+        """Check out a connection, opening a new one if under `maxconn`."""
+        start = time.monotonic()
+        waited = False
+        with self._lock:
+            while not self._idle and self._opened >= self.maxconn:
+                waited = True
+                remaining = self.timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        f"no free connection after {self.timeout:.1f}s "
+                        f"(pool size {self.maxconn})"
+                    )
+                self._lock.wait(remaining)
+
+            if waited:
+                elapsed = time.monotonic() - start
+                self._waits += 1
+                self._wait_total += elapsed
+                self._wait_max = max(self._wait_max, elapsed)
+            self._checkouts += 1
+
+            if self._idle:
+                return self._idle.pop()
+            self._opened += 1              # reserve the slot before connecting
+
+        try:
+            return self._connect()
+        except Exception:
+            with self._lock:
+                self._opened -= 1
+                self._lock.notify()
+            raise
+
+    def putconn(self, conn, discard: bool = False):
+        """Return a connection; closed or discarded ones free their slot."""
+        if discard or conn.closed:
+            try:
+                conn.close()
+            except Exception:
+                pass
+            with self._lock:
+                self._opened -= 1
+                self._lock.notify()
+            return
+
+        with self._lock:
+            self._idle.append(conn)
+            self._lock.notify()
+
+    def reconnect(self, conn):
+        """Replace a dead checked-out connection with a fresh one (same slot)."""
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._reconnects += 1
+        # on failure the caller still holds the closed `conn`; handing it
+        # back through putconn() frees the slot
+        return self._connect()
+
+    def closeall(self):
+        with self._lock:
+            for conn in self._idle:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._opened -= len(self._idle)
+            self._idle.clear()
+            self._lock.notify_all()
+
+    def stats(self) -> dict:
+        """Snapshot of pool sizing / contention counters."""
+        with self._lock:
+            return {
+                "max_size":        self.maxconn,
+                "open":            self._opened,
+                "idle":            len(self._idle),
+                "in_use":          self._opened - len(self._idle),
+                "checkouts":       self._checkouts,
+                "waits":           self._waits,
+                "wait_total_s":    round(self._wait_total, 4),
+                "wait_avg_s":      round(self._wait_total / self._waits, 4)
+                                   if self._waits else 0.0,
+                "wait_max_s":      round(self._wait_max, 4),
+                "timeouts":        self._timeouts,
+                "reconnects":      self._reconnects,
+            }
+
+# ─────────────────────────────────────────────────────────────
+# 2. Tag-invalidated read cache (opt-in per fetch)
+# ─────────────────────────────────────────────────────────────
+_WRITE_TARGET = re.compile(
+    r"\b(?:UPDATE|INSERT\s+INTO|DELETE\s+FROM|TRUNCATE(?:\s+TABLE)?)\s+"
+    r"(?:ONLY\s+)?([\w.\"]+)",
+    re.IGNORECASE,
+)
+
+def _norm_table(name: str) -> str:
+    """'public."PurchaseOrders"' → 'purchaseorders'."""
+    return name.split(".")[-1].strip('"').lower()
+
+def tables_written(query: str) -> set:
+    """Best-effort list of tables an INSERT/UPDATE/DELETE touches."""
+    return {_norm_table(m) for m in _WRITE_TARGET.findall(query)}
+
+def _freeze(value):
+    """Make query params hashable (lists → tuples, recursively)."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+class QueryCache:
+    """
+    LRU of SELECT results keyed by (query, params) and tagged with the
+    tables they read.  `invalidate(tags)` drops every entry reading any of
+    those tables; entries also expire after `ttl` seconds.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE,
+                 ttl: float = DEFAULT_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data: OrderedDict = OrderedDict()   # key → (expires, tags, rows)
+        self._by_tag: dict = {}                   # tag → {key, …}
+        self._gen: dict = {}                      # tag → invalidation count
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def _drop(self, key):
+        _, tags, _ = self._data.pop(key)
+        for tag in tags:
+            keys = self._by_tag.get(tag)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def generation(self, tags) -> tuple:
+        """Snapshot taken before a query; put() refuses stale results."""
+        with self._lock:
+            return tuple(self._gen.get(_norm_table(t), 0) for t in sorted(tags))
+
+    def put(self, key, tags, rows, generation=None):
+        with self._lock:
+            # a write landed while the SELECT was running → don't cache
+            if generation is not None and generation != tuple(
+                self._gen.get(_norm_table(t), 0) for t in sorted(tags)
+            ):
+                return
+            tags = frozenset(_norm_table(t) for t in tags)
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (time.monotonic() + self.ttl, tags, rows)
+            for tag in tags:
+                self._by_tag.setdefault(tag, set()).add(key)
+            while len(self._data) > self.maxsize:
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+
+    def invalidate(self, tags):
+        with self._lock:
+            for tag in {_norm_table(t) for t in tags}:
+                self._gen[tag] = self._gen.get(tag, 0) + 1
+                for key in list(self._by_tag.get(tag, ())):
+                    self._drop(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._by_tag.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._data), "max_size": self.maxsize,
+                    "ttl_s": self.ttl, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions,
+                    "invalidations": self.invalidations}
+
+# ─────────────────────────────────────────────────────────────
+# 3. Named prepared statements (declared once, prepared per connection)
+# ─────────────────────────────────────────────────────────────
+_PLACEHOLDER = re.compile(r"%%|%s")
+_STATEMENT_NAME = re.compile(r"[a-z_][a-z0-9_]*")
+_statements: dict = {}           # name → Statement (process-wide registry)
+
+
+def transaction_pooled(dsn: str) -> bool:
+    """
+    Best effort: does `dsn` go through a transaction-mode pooler (a Neon
+    "-pooler" host)?  Session state – PREPAREd statements, LISTEN – does
+    not survive there: the next transaction may run on another server
+    connection.
+    """
+    try:
+        host = extensions.parse_dsn(dsn).get("host") or ""
+    except psycopg2.ProgrammingError:          # unparsable – let connect() say so
+        return False
+    return "-pooler" in host
+
+
+class Statement:
+    """
+    A hot query declared once at import with `statement(name, sql)`.  Pass
+    it to fetch / fetch_one / execute in place of the SQL text: each pooled
+    connection PREPAREs it on first use and afterwards only sends EXECUTE,
+    so PostgreSQL skips the parse / plan step.  `sql` keeps psycopg2's %s
+    placeholders (rewritten to $1..$n for PREPARE).
+    """
+
+    __slots__ = ("name", "sql", "prepare_sql", "execute_sql")
+
+    def __init__(self, name: str, sql: str):
+        count = 0
+
+        def _number(match):
+            nonlocal count
+            if match.group() == "%%":
+                return "%"
+            count += 1
+            return f"${count}"
+
+        self.name = name
+        self.sql = sql
+        self.prepare_sql = f"PREPARE {name} AS {_PLACEHOLDER.sub(_number, sql)}"
+        self.execute_sql = (f"EXECUTE {name} ({', '.join(['%s'] * count)})"
+                            if count else f"EXECUTE {name}")
+
+    def __str__(self):
+        return self.sql
+
+    def __repr__(self):
+        return f"Statement({self.name!r})"
+
+def statement(name: str, sql: str) -> Statement:
+    """Register (or fetch the identical earlier registration of) a statement."""
+    if not _STATEMENT_NAME.fullmatch(name):
+        raise ValueError(f"invalid statement name {name!r}")
+    known = _statements.get(name)
+    if known is not None:
+        if known.sql != sql:
+            raise ValueError(f"statement {name!r} already declared with other SQL")
+        return known
+    _statements[name] = stmt = Statement(name, sql)
+    return stmt
+
+def registered_statements() -> dict:
+    return dict(_statements)
+
+
+class PreparingConnection(extensions.connection):
+    """psycopg2 connection remembering which statements it has PREPAREd.
+    A reconnect builds a new object, so everything is re-prepared lazily."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared: set = set()
 
 # ─────────────────────────────────────────────────────────────
-# 2. Thin database manager (auto-reconnect + helpers)
+# 4. Query instrumentation (hooks, per-run recorder, slow log)
 # ─────────────────────────────────────────────────────────────
+def fingerprint(query: str) -> str:
+    """Whitespace-insensitive short id for a SQL text."""
+    norm = " ".join(query.split())
+    return hashlib.md5(norm.encode()).hexdigest()[:10]
+
+_current_recorder: ContextVar = ContextVar("db_query_recorder", default=None)
+
+
+class QueryRecorder:
+    """
+    Collects the query events of one script run.  Each event is a dict:
+    fingerprint, sql, kind (fetch/execute/transaction), duration_ms, rows,
+    retries, reconnects, cached, error.
+    """
+
+    FIELDS = ("fingerprint", "kind", "sql", "duration_ms", "rows",
+              "retries", "reconnects", "cached", "error")
+
+    def __init__(self):
+        self.events: list = []
+        self._lock = threading.Lock()
+
+    def __call__(self, event: dict) -> None:
+        with self._lock:
+            self.events.append(event)
+
+    def summary(self) -> list:
+        """One row per fingerprint, most total time first."""
+        agg: dict = {}
+        with self._lock:
+            events = list(self.events)
+        for e in events:
+            a = agg.setdefault(e["fingerprint"], {
+                "fingerprint": e["fingerprint"], "kind": e["kind"],
+                "sql": e["sql"], "calls": 0, "cached": 0, "total_ms": 0.0,
+                "max_ms": 0.0, "rows": 0, "retries": 0, "reconnects": 0,
+                "errors": 0,
+            })
+            a["calls"] += 1
+            a["cached"] += bool(e["cached"])
+            a["total_ms"] += e["duration_ms"]
+            a["max_ms"] = max(a["max_ms"], e["duration_ms"])
+            a["rows"] += e["rows"] or 0
+            a["retries"] += e["retries"]
+            a["reconnects"] += e["reconnects"]
+            a["errors"] += bool(e["error"])
+        return sorted(agg.values(), key=lambda a: a["total_ms"], reverse=True)
+
+    def totals(self) -> dict:
+        with self._lock:
+            events = list(self.events)
+        return {"queries": len(events),
+                "db_round_trips": sum(not e["cached"] for e in events),
+                "total_ms": round(sum(e["duration_ms"] for e in events), 2)}
+
+    def to_json(self) -> str:
+        with self._lock:
+            events = list(self.events)
+        return json.dumps({"totals": self.totals(), "summary": self.summary(),
+                           "events": events}, default=str, indent=2)
+
+    def to_csv(self) -> str:
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=self.FIELDS)
+        writer.writeheader()
+        with self._lock:
+            writer.writerows(self.events)
+        return buf.getvalue()
+
+
+def start_query_recording() -> QueryRecorder:
+    """Attach a fresh recorder to the current script run (context)."""
+    recorder = QueryRecorder()
+    _current_recorder.set(recorder)
+    return recorder
+
+def current_query_recorder():
+    return _current_recorder.get()
+
+# ─────────────────────────────────────────────────────────────
+# 5. Thin database manager (auto-reconnect + helpers)
+# ─────────────────────────────────────────────────────────────
+_in_read_worker: ContextVar = ContextVar("db_in_read_worker", default=False)
+_stream_ids = itertools.count(1)  # unique server-side cursor names
+
+def _read_worker(fn, args, kwargs):
+    """Body of one submit() task (runs inside a copy of the caller's context)."""
+    _in_read_worker.set(True)
+    return fn(*args, **kwargs)
+
 class DatabaseManager:
     def __init__(self):
-        self.dsn  = st.secrets["neon"]["dsn"]
-        self.conn = _get_conn_cached(self.dsn)          # reused across reruns
+        cfg = st.secrets["neon"]
+        self.dsn  = cfg["dsn"]
+        self.pool = ConnectionPool(
+            self.dsn,
+            minconn=int(cfg.get("pool_min", DEFAULT_POOL_MIN)),
+            maxconn=int(cfg.get("pool_max", DEFAULT_POOL_MAX)),
+            timeout=float(cfg.get("pool_timeout", DEFAULT_POOL_TIMEOUT)),
+        )
+        self.cache = QueryCache(
+            maxsize=int(cfg.get("cache_size", DEFAULT_CACHE_SIZE)),
+            ttl=float(cfg.get("cache_ttl", DEFAULT_CACHE_TTL)),
+        )
+        self.slow_query_ms = float(cfg.get("slow_query_ms", DEFAULT_SLOW_QUERY_MS))
+        self.parallel_reads = int(cfg.get("parallel_reads", DEFAULT_PARALLEL_READS))
+        # always off behind a Neon "-pooler" host, where a PREPARE may land
+        # on another server connection; set `prepared_statements = false`
+        # for other transaction-mode poolers (PgBouncer)
+        self.use_prepared = (bool(cfg.get("prepared_statements", DEFAULT_PREPARED))
+                             and not transaction_pooled(self.dsn))
+        # opt-in: needs sql/003_po_change_notify.sql, and LISTEN needs a
+        # session-mode connection – point `listen_dsn` at the direct (non
+        # "-pooler") host when `dsn` goes through PgBouncer
+        self.live_updates = bool(cfg.get("live_updates", DEFAULT_LIVE_UPDATES))
+        self.listen_dsn = cfg.get("listen_dsn", self.dsn)
+        self.hooks: list = []          # callables receiving every query event
+        self._executor = None          # built on the first submit()
+        self._executor_lock = threading.Lock()
+        self._listeners: dict = {}     # channel → NotifyListener
+
+    # ---------- instrumentation ----------
+    def add_hook(self, hook) -> None:
+        """Register `hook(event: dict)`, called after every query."""
+        self.hooks.append(hook)
+
+    def _emit(self, kind, query, started, rows=None, info=None,
+              cached=False, error=None):
+        info = info or {}
+        event = {
+            "fingerprint": fingerprint(query),
+            "kind":        kind,
+            "sql":         " ".join(query.split())[:500],
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            "rows":        rows,
+            "retries":     info.get("retries", 0),
+            "reconnects":  info.get("reconnects", 0),
+            "cached":      cached,
+            "error":       repr(error) if error else None,
+        }
+        if event["duration_ms"] >= self.slow_query_ms and not cached:
+            slow_log.warning("slow %s %.1f ms rows=%s [%s] %s", kind,
+                             event["duration_ms"], rows,
+                             event["fingerprint"], event["sql"])
+        recorder = _current_recorder.get()
+        if recorder is not None:
+            recorder(event)
+        for hook in self.hooks:
+            try:
+                hook(event)
+            except Exception:          # instrumentation must never break a query
+                logging.getLogger(__name__).exception("query hook failed")
 
     # ---------- internals ----------
-    def _ensure_live(self):
+    def _ensure_live(self, conn, info=None):
         """
         1.  Reconnect if Neon closed the socket.
         2.  Roll back if a previous error left the connection in
             TRANSACTION_STATUS_INERROR, otherwise the next query
             would raise `InFailedSqlTransaction`.
+        Returns the (possibly replaced) connection.
         """
         # 1️⃣ reconnect if fully closed
-        if self.conn.closed:               # 0 = open, >0 = closed
-            _get_conn_cached.clear()
-            self.conn = _get_conn_cached(self.dsn)
+        if conn.closed:                    # 0 = open, >0 = closed
+            if info is not None:
+                info["reconnects"] += 1
+            return self.pool.reconnect(conn)
 
         # 2️⃣ recover from a failed transaction block
         if (
-            self.conn.get_transaction_status()
+            conn.get_transaction_status()
             == extensions.TRANSACTION_STATUS_INERROR
         ):
             try:
-                self.conn.rollback()       # clear the aborted Tx
+                conn.rollback()            # clear the aborted Tx
             except Exception:
                 # if rollback itself fails, start fresh
-                _get_conn_cached.clear()
-                self.conn = _get_conn_cached(self.dsn)
- 
-    def _retry_if_needed(self, fn, *args, **kwargs):
+                if info is not None:
+                    info["reconnects"] += 1
+                return self.pool.reconnect(conn)
+        return conn
+
+    def _probe(self, conn, info):
+        """
+        Round-trip `SELECT 1` on an idle-looking connection and reconnect if
+        the server side is gone.  `conn.closed` only turns true after libpq
+        has noticed, so a socket Neon dropped during an idle spell still
+        looks open until the first real statement fails.  Run in autocommit
+        so the probe does not open the caller's transaction.
+        """
         try:
-            return fn(*args, **kwargs)                  # first attempt
+            conn.autocommit = True
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+            finally:
+                if not conn.closed:
+                    conn.autocommit = False
+            return conn
         except OperationalError:
-            _get_conn_cached.clear()                    # reconnect + retry once
-            self.conn = _get_conn_cached(self.dsn)
-            return fn(*args, **kwargs)
+            info["reconnects"] += 1
+            return self.pool.reconnect(conn)
+
+    def _execute(self, cur, query, params=None):
+        """
+        cur.execute() for SQL text or a Statement.  A Statement is PREPAREd
+        on the connection the first time it runs there, then EXECUTEd.  If
+        the server's set drifted (DISCARD ALL, a schema change under a
+        cached `SELECT *` plan) it is re-prepared once – only when no
+        earlier statement of the transaction would be rolled back with it;
+        if that fails too, the statement runs as plain SQL.
+        """
+        if not isinstance(query, Statement):
+            cur.execute(query, params or ())
+            return
+        if not self.use_prepared:
+            cur.execute(query.sql, params or ())
+            return
+
+        conn = cur.connection
+        fresh_tx = (conn.get_transaction_status()
+                    == extensions.TRANSACTION_STATUS_IDLE)
+        for attempt in (1, 2):
+            try:
+                if query.name not in conn.prepared:
+                    cur.execute(query.prepare_sql)
+                    conn.prepared.add(query.name)
+                cur.execute(query.execute_sql, params or ())
+                return
+            except (errors.InvalidSqlStatementName,
+                    errors.DuplicatePreparedStatement,
+                    errors.FeatureNotSupported) as exc:
+                if not fresh_tx:
+                    raise
+                conn.rollback()
+                if attempt == 2:
+                    # the server connection changed under us again (an
+                    # undetected transaction pooler): run this one unprepared
+                    conn.prepared.discard(query.name)
+                    cur.execute(query.sql, params or ())
+                    return
+                if isinstance(exc, errors.DuplicatePreparedStatement):
+                    conn.prepared.add(query.name)      # already there: use it
+                    continue
+                was_prepared = query.name in conn.prepared
+                conn.prepared.discard(query.name)
+                if was_prepared and isinstance(exc, errors.FeatureNotSupported):
+                    cur.execute(f"DEALLOCATE {query.name}")   # stale plan
+
+    def _run(self, fn, info):
+        """
+        Check out a connection, run `fn(conn)`, and hand the connection back.
+        An OperationalError (dropped socket) reconnects and retries once.
+        Retry / reconnect counts are written into `info`.
+        """
+        conn = self.pool.getconn()
+        try:
+            conn = self._ensure_live(conn, info)
+            try:
+                return fn(conn)                         # first attempt
+            except OperationalError:
+                info["retries"] += 1
+                info["reconnects"] += 1
+                conn = self.pool.reconnect(conn)        # reconnect + retry once
+                return fn(conn)
+        finally:
+            self.pool.putconn(conn)
 
     # ---------- public helpers ----------
-    def fetch(self, query: str, params=None):
-        """Run SELECT and return list[dict]."""
-        def _run():
-            with self.conn.cursor() as cur:
-                cur.execute(query, params or ())
-                return cur.fetchall()
-        self._ensure_live()
-        return self._retry_if_needed(_run)
-
-    def execute(self, query: str, params=None, returning=False):
-        """Run INSERT/UPDATE/DELETE (optionally RETURNING one row)."""
-        def _run():
-            with self.conn.cursor() as cur:
-                cur.execute(query, params or ())
+    @contextmanager
+    def transaction(self, invalidates=()):
+        """
+        Yield a cursor on a checked-out connection; commit on success,
+        roll back on error.  Use this when several statements must land
+        together.  The connection is probed (and replaced if dead) before
+        the block runs; once it has run there is no automatic retry – a
+        half-run Tx is not replayable.
+        `invalidates` lists the tables written, for the read cache.
+        """
+        label = f"TRANSACTION ({', '.join(invalidates) or '-'})"
+        started, info = time.perf_counter(), {"retries": 0, "reconnects": 0}
+        conn = self.pool.getconn()
+        discard = False
+        try:
+            conn = self._probe(self._ensure_live(conn, info), info)
+            with conn.cursor() as cur:
+                yield cur
+                rows = cur.rowcount
+            conn.commit()
+        except OperationalError as exc:
+            discard = True                 # socket is gone – drop it
+            self._emit("transaction", label, started, None, info, error=exc)
+            raise
+        except Exception as exc:
+            conn.rollback()
+            self._emit("transaction", label, started, None, info, error=exc)
+            raise
+        finally:
+            self.pool.putconn(conn, discard=discard)
+        self.cache.invalidate(invalidates)
+        self._emit("transaction", label, started, rows, info)
+
+    def fetch(self, query, params=None, cache_tags=None):
+        """
+        Run SELECT (SQL text or a registered Statement) and return list[dict].
+        Pass `cache_tags` (tables the query reads) to serve repeats from the
+        read cache until a write to one of those tables invalidates it.
+        """
+        started, info = time.perf_counter(), {"retries": 0, "reconnects": 0}
+        sql = str(query)
+        if cache_tags:
+            key = (sql, _freeze(params))
+            rows = self.cache.get(key)
+            if rows is not None:
+                self._emit("fetch", sql, started, len(rows), cached=True)
+                return [dict(r) for r in rows]     # callers may mutate rows
+            generation = self.cache.generation(cache_tags)
+
+        def _run(conn):
+            with conn.cursor() as cur:
+                self._execute(cur, query, params)
+                rows = cur.fetchall()
+            conn.rollback()                # end the implicit read Tx
+            return rows
+        try:
+            rows = self._run(_run, info)
+        except Exception as exc:
+            self._emit("fetch", sql, started, None, info, error=exc)
+            raise
+        self._emit("fetch", sql, started, len(rows), info)
+
+        if cache_tags:
+            self.cache.put(key, cache_tags, [dict(r) for r in rows], generation)
+        return rows
+
+    def execute(self, query, params=None, returning=False, invalidates=None):
+        """
+        Run INSERT/UPDATE/DELETE (optionally RETURNING one row).
+        Cached reads of the written tables are dropped; the tables are taken
+        from the SQL unless `invalidates` names them explicitly.
+        """
+        started, info = time.perf_counter(), {"retries": 0, "reconnects": 0}
+        sql = str(query)
+
+        def _run(conn):
+            with conn.cursor() as cur:
+                self._execute(cur, query, params)
                 row = cur.fetchone() if returning else None
-            self.conn.commit()
+                info["rows"] = cur.rowcount
+            conn.commit()
             return row
-        self._ensure_live()
-        return self._retry_if_needed(_run)
+        try:
+            row = self._run(_run, info)
+        except Exception as exc:
+            self._emit("execute", sql, started, None, info, error=exc)
+            raise
+        self.cache.invalidate(tables_written(sql) if invalidates is None
+                              else invalidates)
+        self._emit("execute", sql, started, info.get("rows"), info)
+        return row
+
+    def fetch_df(self, query, params=None, columns=None, group_by=None,
+                 dtypes=None):
+        """
+        Run SELECT and build a pandas DataFrame column-wise from plain tuple
+        rows – no dict per row, one frame build.  `columns` renames the
+        SELECT list (display names, same order).  `dtypes` ({column: dtype})
+        is applied to the built frame – e.g. "Int64" so a nullable integer
+        column doesn't come back as float64 with NaN.  With `group_by` (one
+        of the column names; rows must be ORDER BY it) returns {value: frame}
+        without that column.  Not read-cached: keep the frame instead.
+        """
+        import pandas as pd
+
+        started, info = time.perf_counter(), {"retries": 0, "reconnects": 0}
+        sql = str(query)
+
+        def _run(conn):
+            with conn.cursor(cursor_factory=extensions.cursor) as cur:
+                self._execute(cur, query, params)
+                names = [d.name for d in cur.description]
+                rows = cur.fetchall()
+            conn.rollback()                # end the implicit read Tx
+            return names, rows
+        try:
+            names, rows = self._run(_run, info)
+        except Exception as exc:
+            self._emit("fetch", sql, started, None, info, error=exc)
+            raise
+        self._emit("fetch", sql, started, len(rows), info)
+
+        if columns is not None:
+            if len(columns) != len(names):
+                raise ValueError(f"{len(columns)} column names for {len(names)} columns")
+            names = list(columns)
+
+        arrays = list(zip(*rows)) or [()] * len(names)
+
+        def _frame(keep, index=None):
+            frame = pd.DataFrame({names[i]: arrays[i] for i in keep},
+                                 columns=[names[i] for i in keep], index=index)
+            return frame.astype(dtypes) if dtypes else frame
+
+        if group_by is None:
+            return _frame(range(len(names)))
+        # one frame for all groups, handed out as row slices (no per-group
+        # build); the index restarts at 0 inside every group
+        pos = names.index(group_by)
+        runs = [(key, sum(1 for _ in run)) for key, run in itertools.groupby(arrays[pos])]
+        frame = _frame([i for i in range(len(names)) if i != pos],
+                       index=[i for _, n in runs for i in range(n)])
+        groups, start = {}, 0
+        for key, n in runs:
+            groups[key] = frame.iloc[start:start + n]
+            start += n
+        return groups
+
+    @contextmanager
+    def stream(self, query, params=None, chunk_size=DEFAULT_STREAM_CHUNK):
+        """
+        Iterate a large SELECT through a named (server-side) cursor.
+        Yields (column_names, rows): `rows` is an iterator of plain tuples
+        pulled `chunk_size` at a time, so memory stays flat however many
+        rows there are.  Holds one pooled connection until the block exits
+        (no retry – a half-read cursor is not replayable).
+        """
+        started, info = time.perf_counter(), {"retries": 0, "reconnects": 0}
+        sql = str(query)
+        conn = self.pool.getconn()
+        discard, count = False, 0
+        try:
+            conn = self._ensure_live(conn, info)
+            name = f"stream_{threading.get_ident()}_{next(_stream_ids)}"
+            with conn.cursor(name, cursor_factory=extensions.cursor) as cur:
+                cur.execute(sql, params or ())
+                first = cur.fetchmany(chunk_size)     # description needs a fetch
+                columns = [d.name for d in cur.description]
+
+                def _rows():
+                    nonlocal count
+                    chunk = first
+                    while chunk:
+                        count += len(chunk)
+                        yield from chunk
+                        chunk = cur.fetchmany(chunk_size)
+
+                yield columns, _rows()
+            conn.rollback()                # close the read Tx (and the cursor)
+        except OperationalError as exc:
+            discard = True
+            self._emit("stream", sql, started, count, info, error=exc)
+            raise
+        except BaseException as exc:
+            conn.rollback()
+            if isinstance(exc, Exception):
+                self._emit("stream", sql, started, count, info, error=exc)
+            raise
+        finally:
+            self.pool.putconn(conn, discard=discard)
+        self._emit("stream", sql, started, count, info)
 
     # handy one-liner for a single row
-    def fetch_one(self, query: str, params=None):
-        rows = self.fetch(query, params)
+    def fetch_one(self, query, params=None, cache_tags=None):
+        rows = self.fetch(query, params, cache_tags)
         return rows[0] if rows else None
 
+    # ---------- concurrent reads ----------
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """
+        Run `fn(*args, **kwargs)` – typically a handler that only reads – on
+        the read executor and return its Future.  Each call checks out its
+        own pool connection, so independent queries overlap their round
+        trips.  The caller's context (query recorder) is carried over; `fn`
+        must not touch `st.*` (worker threads have no script-run context).
+        Inside a worker, submit() runs inline so nesting cannot deadlock.
+        """
+        if _in_read_worker.get() or self.parallel_reads <= 1:
+            fut = Future()
+            try:
+                fut.set_result(fn(*args, **kwargs))
+            except Exception as exc:
+                fut.set_exception(exc)
+            return fut
+
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=min(self.parallel_reads, self.pool.maxconn),
+                    thread_name_prefix="db-read",
+                )
+        return self._executor.submit(copy_context().run, _read_worker, fn, args, kwargs)
+
+    def gather(self, *calls) -> list:
+        """
+        Run zero-argument callables concurrently and return their results in
+        order; waits for all, then re-raises the first failure.
+        """
+        futures = [self.submit(call) for call in calls]
+        wait(futures)                  # nothing left running when we raise
+        return [f.result() for f in futures]
+
+    # ---------- LISTEN / NOTIFY ----------
+    def listen(self, channel, callback, on_connect=None):
+        """
+        Start (once per channel and process) a NotifyListener thread that
+        passes payload batches to `callback`.  Returns None when
+        `live_updates` is off, or `listen_dsn` is a transaction pooler
+        (LISTEN would succeed there but never receive anything).
+        """
+        if not self.live_updates:
+            return None
+        if transaction_pooled(self.listen_dsn):
+            logging.getLogger(__name__).warning(
+                "live_updates: listen_dsn is a pooler host – set it to the "
+                "direct host; falling back to full reloads")
+            return None
+        with self._executor_lock:
+            listener = self._listeners.get(channel)
+            if listener is None:
+                listener = NotifyListener(self.listen_dsn, channel, callback,
+                                          on_connect=on_connect)
+                listener.start()
+                self._listeners[channel] = listener
+        return listener
+
+    def pool_stats(self) -> dict:
+        return self.pool.stats()
+
+    def cache_stats(self) -> dict:
+        return self.cache.stats()
+
 # ─────────────────────────────────────────────────────────────
-# 3. Cached singleton for easy import everywhere
+# 6. LISTEN/NOTIFY listener (one dedicated connection per channel)
+# ─────────────────────────────────────────────────────────────
+class NotifyListener(threading.Thread):
+    """
+    Daemon thread owning one autocommit connection outside the pool that
+    LISTENs on `channel`.  Notifications are passed to
+    `callback(payloads: list[str])`, one batch per wake-up.  After a
+    dropped connection it reconnects with backoff.  `on_connect()` runs
+    after every (re)connect so that subscribers can resync the events sent
+    while nobody was listening.
+    """
+
+    POLL_SECONDS = 5.0             # select() timeout; also how fast stop() acts
+    MAX_BACKOFF = 30.0
+
+    def __init__(self, dsn: str, channel: str, callback, on_connect=None):
+        super().__init__(name=f"pg-listen-{channel}", daemon=True)
+        self.dsn = dsn
+        self.channel = channel
+        self.callback = callback
+        self.on_connect = on_connect
+        self.connected = threading.Event()
+        self._stop_event = threading.Event()
+        self.received = 0
+        self.reconnects = 0
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn, keepalives=1, keepalives_idle=30,
+                                keepalives_interval=10, keepalives_count=3)
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {extensions.quote_ident(self.channel, cur)}")
+        return conn
+
+    def _dispatch(self, conn) -> None:
+        conn.poll()
+        payloads = [n.payload for n in conn.notifies]
+        conn.notifies.clear()
+        if payloads:
+            self.received += len(payloads)
+            try:
+                self.callback(payloads)
+            except Exception:          # a bad subscriber must not kill the thread
+                logging.getLogger(__name__).exception("NOTIFY callback failed")
+
+    def run(self):
+        backoff = 1.0
+        while not self._stop_event.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                self.connected.set()
+                backoff = 1.0
+                if self.on_connect is not None:
+                    self.on_connect()
+                while not self._stop_event.is_set():
+                    ready, _, _ = select.select([conn], [], [], self.POLL_SECONDS)
+                    if ready:
+                        self._dispatch(conn)
+            except Exception:
+                logging.getLogger(__name__).warning(
+                    "LISTEN %s: connection lost, retrying in %.0f s",
+                    self.channel, backoff, exc_info=True)
+            finally:
+                self.connected.clear()
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            if self._stop_event.wait(backoff):
+                break
+            self.reconnects += 1
+            backoff = min(backoff * 2, self.MAX_BACKOFF)
+
+# ─────────────────────────────────────────────────────────────
+# 7. Cached singleton for easy import everywhere
+#    (one manager + pool per process; sessions share the pool,
+#     never a single connection)
 # ─────────────────────────────────────────────────────────────
 @st.cache_resource(show_spinner=False)
 def get_db() -> DatabaseManager:
     return DatabaseManager()
+
+
+class LazyDatabase:
+    """
+    Import-time stand-in for `get_db()`: handler modules can bind
+    `db = LazyDatabase()` at import, and the manager (with its pool) is
+    only built on the first attribute access – i.e. the first query.
+    """
+
+    def __init__(self):
+        self._db = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        db = self._db
+        if db is None:
+            with self._lock:
+                if self._db is None:
+                    self._db = get_db()
+                db = self._db
+        return getattr(db, name)
@@ -0,0 +1,47 @@
+"""
+debug_panel.py
+Optional sidebar panel: queries issued during this script run, grouped by
+fingerprint, with JSON / CSV export plus pool and read-cache counters.
+
+Enabled with `query_panel = true` under `[debug]` in secrets.toml.  With
+`url_toggle = true` there as well, `?debug=queries` in the URL turns it on
+per browser tab; otherwise the URL parameter is ignored, so signed-in users
+can't see query text and pool / cache internals.
+"""
+
+import streamlit as st
+from translation import _
+
+def query_panel_enabled() -> bool:
+    try:
+        cfg = st.secrets.get("debug", {})
+    except Exception:              # no secrets file at all
+        return False
+    if cfg.get("query_panel", False):
+        return True
+    return (bool(cfg.get("url_toggle", False))
+            and st.query_params.get("debug") == "queries")
+
+def render_query_debug_panel(recorder) -> None:
+    """Call at the very end of the run so every query is counted."""
+    if recorder is None or not query_panel_enabled():
+        return
+    import pandas as pd
+    from db_handler import get_db
+
+    totals = recorder.totals()
+    with st.sidebar.expander(_("debug_queries_title"), expanded=False):
+        st.caption(_("debug_queries_totals", **totals))
+        summary = recorder.summary()
+        if summary:
+            st.dataframe(pd.DataFrame(summary), hide_index=True)
+        c1, c2 = st.columns(2)
+        c1.download_button("JSON", recorder.to_json(), "queries.json",
+                           mime="application/json", key="dbg_q_json")
+        c2.download_button("CSV", recorder.to_csv(), "queries.csv",
+                           mime="text/csv", key="dbg_q_csv")
+        db = get_db()
+        st.write(_("debug_pool_stats"))
+        st.json(db.pool_stats(), expanded=False)
+        st.write(_("debug_cache_stats"))
+        st.json(db.cache_stats(), expanded=False)
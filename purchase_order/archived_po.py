@@ -1,49 +1,138 @@
+import datetime
 import streamlit as st
-import pandas as pd
 from translation import _
-from purchase_order.po_handler import get_archived_purchase_orders, get_purchase_order_items
+from purchase_order.po_handler import (
+    ARCHIVED_STATUSES,
+    get_archived_po_page,
+    get_item_tables,
+    get_item_thumbnails,
+)
+
+ARCH_ITEMS_STATE  = "archived_po_items"   # {poid: item DataFrame | None}, opened cards only
+ARCH_WINDOW_STATE = "archived_po_window"  # filters + loaded rows + keyset cursor
+ARCH_TABLE_COLUMNS = ("ItemID", "Item Name", "OrderedQty", "EstPrice")
 
 def show_archived_po_page(supplier):
     """
-    Displays archived POs (Declined, Declined by AMAS, Declined by Supplier, 
+    Displays archived POs (Declined, Declined by AMAS, Declined by Supplier,
     Delivered, Completed) in the same style as Track PO:
-      - Each archived PO is an expander row
-      - Inside each expander, show key details + item info in read-only form
+      - Each archived PO is a card fragment; items load when it is opened
+      - Inside each card, show key details + item info in read-only form
+      - Rows arrive in keyset pages; "Load more" fetches the next one
+      - The search box matches item names, supplier notes and POIDs in SQL
     """
 
     st.subheader(_("archived_po_header"))
+    # a full run (page switch, live rerun) starts again from page 1 so POs
+    # archived since – by either side – show up; "Load more" and the filters
+    # only rerun the list fragment and keep the window
+    st.session_state.pop(ARCH_WINDOW_STATE, None)
+    _export_panel(supplier["supplierid"])
+    _archive_list(supplier["supplierid"])
+
+@st.fragment
+def _export_panel(supplier_id):
+    """Full history (every status) as CSV zip / XLSX, built on demand."""
+    from purchase_order.po_export import FORMATS, export_history, xlsx_available
+
+    with st.expander(_("export_header")):
+        formats = ["csv", "xlsx"] if xlsx_available() else ["csv"]
+        fmt = st.radio(_("export_format"), formats, horizontal=True,
+                       format_func=str.upper, key="arch_export_fmt")
+        if len(formats) == 1:
+            st.caption(_("export_xlsx_missing"))
+        if st.button(_("export_prepare"), key="arch_export_go"):
+            with st.spinner():
+                out, counts = export_history(supplier_id, fmt)
+                with out:                  # Streamlit keeps downloads as bytes
+                    payload = out.read()
+            ext, mime = FORMATS[fmt]
+            st.caption(_("export_ready", **counts))
+            st.download_button(_("export_download"), payload,
+                               file_name=f"po_history_{supplier_id}.{ext}",
+                               mime=mime, on_click="ignore", key="arch_export_dl")
+
+def _load_next_page(supplier_id):
+    """on_click callback – append one page to the loaded window."""
+    win = st.session_state[ARCH_WINDOW_STATE]
+    statuses, date_from, date_to, search = win["filters"][1:]
+    rows, cursor = get_archived_po_page(supplier_id, win["cursor"],
+                                        statuses, date_from, date_to,
+                                        search=search)
+    win["rows"].extend(rows)
+    win["cursor"] = cursor
+
+@st.fragment
+def _archive_list(supplier_id):
+    # ----- Filters (pushed into SQL) -----
+    search = st.text_input(_("arch_search"), key="arch_f_search",
+                           placeholder=_("arch_search_ph")).strip()
+    f1, f2 = st.columns(2)
+    statuses = f1.multiselect(_("status_filter"), ARCHIVED_STATUSES,
+                              key="arch_f_status")
+    dates = f2.date_input(_("date_range_filter"), value=(), key="arch_f_dates")
+    if isinstance(dates, datetime.date):          # single-date fallback
+        date_from = date_to = dates
+    else:                                         # (), (start,) or (start, end)
+        date_from, date_to = (tuple(dates) + (None, None))[:2]
+
+    filters = (supplier_id, tuple(statuses), date_from, date_to, search)
+    win = st.session_state.get(ARCH_WINDOW_STATE)
+    if win is None or win["filters"] != filters:
+        st.session_state[ARCH_WINDOW_STATE] = {"filters": filters, "rows": [],
+                                               "cursor": None}
+        _load_next_page(supplier_id)
+        win = st.session_state[ARCH_WINDOW_STATE]
 
-    archived_orders = get_archived_purchase_orders(supplier["supplierid"])
+    archived_orders = win["rows"]
     if not archived_orders:
-        st.info(_("no_archived_orders"))
+        st.info(_("no_search_matches") if search else _("no_archived_orders"))
         return
 
-    # Loop over each archived PO, creating an expander for details
+    # Lines of every opened card in one query, grouped by POID
+    open_ids = [po["poid"] for po in archived_orders
+                if st.session_state.get(f"arch_open_{po['poid']}")]
+    tables = get_item_tables(open_ids)
+    st.session_state[ARCH_ITEMS_STATE] = {poid: tables.get(poid) for poid in open_ids}
+
+    # One fragment per archived PO
     for po in archived_orders:
-        po_key = po["poid"]
-        with st.expander(_("po_expander", id=po_key, status=po['status'])):
-            # Basic info
-            st.write(_("order_date", date=po['orderdate']))
-            st.write(_("supplier_responded", date=po['respondedat'] or 'N/A'))
-            st.write(_("expected_delivery", date=po['expecteddelivery'] or 'N/A'))
-            st.write(_("sup_proposed_deliver", val=po.get('supproposeddeliver') or 'N/A'))
-            st.write(_("original_poid", val=po.get('originalpoid') or 'N/A'))
-            st.write(_("supplier_note", note=po.get('suppliernote') or ''))
-
-            # Show item details
-            items = get_purchase_order_items(po_key)
-            if items:
-                st.write(_("item_details_header"))
-                rows = []
-                for it in items:
-                    # Minimal item info for archived POs
-                    rows.append({
-                        "ItemID": it["itemid"],
-                        "Item Name": it["itemnameenglish"],
-                        "OrderedQty": it["orderedquantity"],
-                        "EstPrice": it["estimatedprice"] or "N/A",
-                    })
-                df = pd.DataFrame(rows, columns=["ItemID", "Item Name", "OrderedQty", "EstPrice"])
-                st.dataframe(df)
-            else:
-                st.info(_("no_items_archived"))
+        _archived_card(po)
+
+    if win["cursor"] is not None:
+        st.button(_("load_more"), key="arch_load_more",
+                  on_click=_load_next_page, args=(supplier_id,))
+
+@st.fragment
+def _archived_card(po):
+    po_key = po["poid"]
+    with st.container(border=True):
+        st.markdown(f"**{_('po_expander', id=po_key, status=po['status'])}**")
+        if not st.toggle(_("show_details"), key=f"arch_open_{po_key}"):
+            return
+
+        # Basic info
+        st.write(_("order_date", date=po['orderdate']))
+        st.write(_("supplier_responded", date=po['respondedat'] or 'N/A'))
+        st.write(_("expected_delivery", date=po['expecteddelivery'] or 'N/A'))
+        st.write(_("sup_proposed_deliver", val=po.get('supproposeddeliver') or 'N/A'))
+        st.write(_("original_poid", val=po.get('originalpoid') or 'N/A'))
+        st.write(_("supplier_note", note=po.get('suppliernote') or ''))
+
+        # Show item details (lazy: fetched on the fragment rerun that opens it)
+        cache = st.session_state.setdefault(ARCH_ITEMS_STATE, {})
+        if po_key not in cache:
+            cache[po_key] = get_item_tables([po_key]).get(po_key)
+        table = cache[po_key]
+        if table is not None:
+            st.write(_("item_details_header"))
+            # Minimal item info for archived POs (column_order hides the rest)
+            df, order, col_cfg = table, ARCH_TABLE_COLUMNS, None
+            if st.checkbox(_("show_pictures"), key=f"arch_pics_{po_key}"):
+                thumbs = get_item_thumbnails(zip(table["ItemID"], table["PictureVersion"]))
+                df = table.assign(Picture=[thumbs.get(i) for i in table["ItemID"]])
+                order = ("Picture",) + ARCH_TABLE_COLUMNS
+                col_cfg = {"Picture": st.column_config.ImageColumn(_("picture_col"))}
+            st.dataframe(df, column_order=order, column_config=col_cfg)
+        else:
+            st.info(_("no_items_archived"))
@@ -0,0 +1,77 @@
+"""
+purchase_order/item_grid.py
+Editable line grid for the Accept / Modify forms.  One st.data_editor over
+the card's item table (po_handler.get_item_tables) replaces the per-line
+widgets; only the cells the supplier changed go to the batched writer
+(po_handler.update_po_item_proposals) as a diff.
+"""
+
+import datetime
+
+import pandas as pd
+
+GRID_COLUMNS = ("ItemID", "Item Name", "OrderedQty", "EstPrice",
+                "Qty", "Price", "Expiration")
+READ_ONLY = ("ItemID", "Item Name", "OrderedQty", "EstPrice")
+# grid column → position in the writer's (itemid, qty, price, exp) tuples
+EDITABLE = {"Qty": 1, "Price": 2, "Expiration": 3}
+
+def proposal_grid(table, today=None) -> pd.DataFrame:
+    """
+    Grid frame for an item table: the current proposal, else the ordered
+    values; expiration defaults to `today`.
+    """
+    today = today or datetime.date.today()
+    est = pd.to_numeric(table["EstPrice"]).astype(float)
+    return pd.DataFrame({
+        "ItemID":     table["ItemID"],
+        "Item Name":  table["Item Name"],
+        "OrderedQty": table["OrderedQty"],
+        "EstPrice":   est,
+        "Qty":        pd.to_numeric(table["SupQty"]).fillna(table["OrderedQty"])
+                        .astype("int64"),
+        "Price":      pd.to_numeric(table["SupPrice"]).astype(float)
+                        .fillna(est).fillna(0.0),
+        "Expiration": table["SupExpDate"].where(table["SupExpDate"].notna(), today),
+    }, index=table.index)
+
+def _dates(series):
+    return pd.to_datetime(series, errors="coerce")
+
+def _value(col, v):
+    """Editor cell → writer value; a cleared cell (NaN / NaT) means keep."""
+    if v is None or pd.isna(v):
+        return None
+    if col == "Qty":
+        return int(v)
+    if col == "Price":
+        return round(float(v), 2)
+    return pd.Timestamp(v).date()
+
+def grid_changes(base, edited, columns=tuple(EDITABLE), force=None) -> list:
+    """
+    (itemid, qty, price, exp) for every row where one of `columns` differs
+    between the grid as shown (`base`) and as submitted (`edited`).  Cells
+    that did not change – or were cleared – are sent as None, i.e. kept.
+    `force`: {column: boolean Series} – rows to send for that column even
+    when unchanged (e.g. Accept needs a stored expiration on every line).
+    """
+    changed = {}
+    for col in columns:
+        old, new = base[col], edited[col]
+        if col == "Expiration":
+            old, new = _dates(old), _dates(new)
+        diff = (old != new) & new.notna()       # cleared cell = keep
+        if force and col in force:
+            diff |= force[col]
+        changed[col] = diff
+
+    any_changed = pd.concat(changed, axis=1).any(axis=1)
+    out = []
+    for idx in edited.index[any_changed]:
+        row = [int(edited.at[idx, "ItemID"]), None, None, None]
+        for col, diff in changed.items():
+            if diff[idx]:
+                row[EDITABLE[col]] = _value(col, edited.at[idx, col])
+        out.append(tuple(row))
+    return out
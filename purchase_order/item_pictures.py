@@ -0,0 +1,109 @@
+"""
+purchase_order/item_pictures.py
+Item thumbnails – format sniffing from magic bytes, one-time resize, and a
+bounded LRU cache keyed by (ItemID, row version).
+"""
+
+import base64
+import io
+import threading
+from collections import OrderedDict
+
+THUMB_SIZE = (96, 96)            # px, fits inside a dataframe row
+CACHE_SIZE = 1024                # thumbnails kept per process
+
+# (leading signature, PIL format name)
+_MAGIC = (
+    (b"\x89PNG\r\n\x1a\n", "PNG"),
+    (b"\xff\xd8\xff",      "JPEG"),
+    (b"GIF87a",            "GIF"),
+    (b"GIF89a",            "GIF"),
+    (b"BM",                "BMP"),
+)
+
+# ───────────────────────────────────────────────────────────────
+# Format detection (header only, no decode)
+# ───────────────────────────────────────────────────────────────
+def detect_format(data: bytes) -> str | None:
+    """Return 'PNG' / 'JPEG' / 'GIF' / 'BMP' / 'WEBP' or None."""
+    if not data:
+        return None
+    head = bytes(data[:12])
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "WEBP"
+    for magic, fmt in _MAGIC:
+        if head.startswith(magic):
+            return fmt
+    return None
+
+# ───────────────────────────────────────────────────────────────
+# Thumbnail generation
+# ───────────────────────────────────────────────────────────────
+def make_thumbnail(data: bytes, size=THUMB_SIZE) -> str | None:
+    """
+    Downscale `data` to fit `size` and return a data-URI, or None when the
+    bytes are not a recognised image.  JPEG stays JPEG; everything else is
+    re-encoded as PNG to keep transparency.
+    """
+    if detect_format(data) is None:
+        return None
+    from PIL import Image              # heavy import, only when resizing
+
+    try:
+        img = Image.open(io.BytesIO(data))
+        img.draft("RGB", size)         # JPEG: decode at reduced scale
+        img.thumbnail(size)
+        out_fmt = "JPEG" if img.format == "JPEG" or img.mode == "CMYK" else "PNG"
+        if out_fmt == "JPEG" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        buf = io.BytesIO()
+        img.save(buf, format=out_fmt)
+    except Exception:
+        return None
+    return (
+        f"data:image/{out_fmt.lower()};"
+        f"base64,{base64.b64encode(buf.getvalue()).decode()}"
+    )
+
+# ───────────────────────────────────────────────────────────────
+# Bounded LRU cache
+# ───────────────────────────────────────────────────────────────
+class ThumbnailCache:
+    """Thread-safe LRU of data-URIs keyed by (itemid, picture version) – the
+    Item row's xmin, so a changed picture gets a new key."""
+
+    def __init__(self, maxsize: int = CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._data), "max_size": self.maxsize,
+                    "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions}
+
+
+thumbnail_cache = ThumbnailCache()
@@ -0,0 +1,133 @@
+"""
+purchase_order/po_events.py
+Live PO updates.  sql/003_po_change_notify.sql makes every committed change
+to PurchaseOrders / PurchaseOrderItems send NOTIFY po_changes with its
+(SupplierID, POID).  One listener thread per process (db_handler.NotifyListener)
+feeds an in-process bus, which drops the stale cached reads and fans the
+POIDs out to the subscribed sessions of that supplier only.  A session then
+reloads just those POs (see track_po.prefetch_track_po).
+"""
+
+import json
+import logging
+import threading
+import time
+import weakref
+from collections import defaultdict, deque
+
+import streamlit as st
+
+from db_handler import get_db
+from purchase_order.po_handler import invalidate_po_reads
+
+CHANNEL = "po_changes"             # must match sql/003_po_change_notify.sql
+OWN_TX_KEPT = 64                   # own write transactions remembered per session
+RESYNC_SECONDS = 300.0             # full reload at least this often – safety net
+                                   # for NOTIFYs that never arrive (sql/003 not
+                                   # applied, a pooler between us and the server)
+
+class Subscription:
+    """
+    One session's inbox: POIDs changed since its last `drain()`.  Kept in
+    session_state; the bus only holds it weakly, so a closed session simply
+    disappears.  Changes made by the session's own writes (already patched
+    into its state) are skipped via `ignore(txid)`.
+    """
+
+    def __init__(self, supplier_id: int):
+        self.supplier_id = supplier_id
+        self._lock = threading.Lock()
+        self._changes: set = set()     # (poid, txid)
+        self._resync = True            # nothing loaded yet → full reload
+        self._synced_at = 0.0          # monotonic time of the last full reload
+        self._own = deque(maxlen=OWN_TX_KEPT)
+
+    def _stale(self) -> bool:
+        return time.monotonic() - self._synced_at >= RESYNC_SECONDS
+
+    def _push(self, changes) -> None:
+        with self._lock:
+            own = set(self._own)
+            self._changes.update(c for c in changes if c[1] not in own)
+
+    def ignore(self, txid) -> None:
+        """The session applied transaction `txid` itself – its echo (which
+        may arrive before or after this call) is not a change."""
+        if txid is None:
+            return
+        with self._lock:
+            self._own.append(txid)
+            self._changes = {c for c in self._changes if c[1] != txid}
+
+    def _push_resync(self) -> None:
+        with self._lock:
+            self._resync = True
+
+    def pending(self) -> bool:
+        with self._lock:
+            return self._resync or bool(self._changes) or self._stale()
+
+    def drain(self):
+        """Changed POIDs since the last call, or None when the session must
+        reload everything (first call, events may have been missed, or the
+        last full reload is older than RESYNC_SECONDS)."""
+        with self._lock:
+            changes, resync = self._changes, self._resync or self._stale()
+            self._changes, self._resync = set(), False
+            if resync:
+                self._synced_at = time.monotonic()
+        return None if resync else {poid for poid, _ in changes}
+
+class PoEventBus:
+    """SupplierID → live subscriptions; fed by the NOTIFY listener thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs = defaultdict(weakref.WeakSet)
+        self.listener = None           # db_handler.NotifyListener, if running
+
+    @property
+    def live(self) -> bool:
+        return self.listener is not None and self.listener.connected.is_set()
+
+    def subscribe(self, supplier_id: int) -> Subscription:
+        sub = Subscription(supplier_id)
+        with self._lock:
+            self._subs[supplier_id].add(sub)
+        return sub
+
+    def publish(self, changes) -> None:
+        """changes: {supplier_id: {(poid, txid), …}}"""
+        with self._lock:
+            targets = [(sub, changes[sid]) for sid in changes
+                       for sub in list(self._subs.get(sid, ()))]
+        for sub, pairs in targets:
+            sub._push(pairs)
+
+    def resync_all(self) -> None:
+        """Listener (re)connected: anything may have changed meanwhile."""
+        with self._lock:
+            subs = [sub for group in self._subs.values() for sub in list(group)]
+        for sub in subs:
+            sub._push_resync()
+
+    def on_notify(self, payloads) -> None:
+        changes = defaultdict(set)
+        for payload in payloads:
+            try:
+                event = json.loads(payload)
+                changes[int(event["s"])].add((int(event["p"]), event.get("x")))
+            except (ValueError, KeyError, TypeError):
+                logging.getLogger(__name__).warning("bad %s payload: %r",
+                                                    CHANNEL, payload)
+        if changes:
+            invalidate_po_reads(changes)       # before anyone reloads
+            self.publish(changes)
+
+@st.cache_resource(show_spinner=False)
+def get_po_events() -> PoEventBus:
+    """Process-wide bus; starts the LISTEN thread on first use."""
+    bus = PoEventBus()
+    bus.listener = get_db().listen(CHANNEL, bus.on_notify,
+                                   on_connect=bus.resync_all)
+    return bus
@@ -0,0 +1,112 @@
+"""
+purchase_order/po_export.py
+Full PO history export – headers + lines – as a zip of two CSV files or an
+XLSX workbook.  Rows come from server-side cursors a chunk at a time and
+go straight into the output file, so memory stays flat whether a supplier
+has 100 or 1,000,000 lines.  openpyxl (XLSX) is optional.
+"""
+
+import csv
+import datetime
+import io
+import tempfile
+import zipfile
+
+from purchase_order.po_handler import stream_po_history, stream_po_lines
+
+# column headers, in SELECT order of the export queries
+PO_HEADER = ("POID", "OrderDate", "ExpectedDelivery", "Status",
+             "SupProposedDeliver", "OriginalPOID", "SupplierNote", "RespondedAt")
+LINE_HEADER = ("POID", "OrderDate", "Status", "ItemID", "Item Name",
+               "OrderedQty", "EstPrice", "SupQty", "SupPrice", "SupExpDate")
+
+XLSX_MAX_ROWS = 1_048_576          # Excel's per-sheet limit (header included)
+SPOOL_MAX = 8 * 1024 * 1024        # output stays in RAM up to this, then disk
+
+FORMATS = {                        # key → (file extension, MIME type)
+    "csv":  ("zip",  "application/zip"),
+    "xlsx": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+def xlsx_available() -> bool:
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def _check(header, columns):
+    if len(header) != len(columns):
+        raise RuntimeError(f"export query returns {columns}, header is {header}")
+
+# ───────────────────────────────────────────────────────────────
+# CSV (zip with purchase_orders.csv + po_lines.csv)
+# ───────────────────────────────────────────────────────────────
+def _write_csv(zf, name, header, stream) -> int:
+    count = 0
+    with stream as (columns, rows), zf.open(name, "w") as raw:
+        _check(header, columns)
+        text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+        writer = csv.writer(text)
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+        text.flush()
+        text.detach()                  # zf closes the member, not the wrapper
+    return count
+
+def export_csv_zip(supplier_id: int, out=None):
+    """Write the zip into `out` (default: spooled temp file); returns
+    (file rewound to 0, {"pos": n, "lines": m})."""
+    out = out or tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX)
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        pos = _write_csv(zf, "purchase_orders.csv", PO_HEADER,
+                         stream_po_history(supplier_id))
+        lines = _write_csv(zf, "po_lines.csv", LINE_HEADER,
+                           stream_po_lines(supplier_id))
+    out.seek(0)
+    return out, {"pos": pos, "lines": lines}
+
+# ───────────────────────────────────────────────────────────────
+# XLSX (write-only workbook: openpyxl spools each sheet to disk)
+# ───────────────────────────────────────────────────────────────
+def _xlsx_cell(value):
+    # Excel has no time zones
+    if isinstance(value, datetime.datetime) and value.tzinfo is not None:
+        return value.replace(tzinfo=None)
+    return value
+
+def _write_sheets(wb, title, header, stream) -> int:
+    """Append rows, starting a new sheet "<title> (2)" … when one is full."""
+    count, ws, used = 0, None, XLSX_MAX_ROWS
+    with stream as (columns, rows):
+        _check(header, columns)
+        for row in rows:
+            if used >= XLSX_MAX_ROWS:
+                n = count // (XLSX_MAX_ROWS - 1) + 1
+                ws = wb.create_sheet(title if n == 1 else f"{title} ({n})")
+                ws.append(header)
+                used = 1
+            ws.append([_xlsx_cell(v) for v in row])
+            used += 1
+            count += 1
+    if ws is None:                     # no rows: still give the sheet + header
+        wb.create_sheet(title).append(header)
+    return count
+
+def export_xlsx(supplier_id: int, out=None):
+    """Like `export_csv_zip`, as one workbook (sheets: Purchase Orders, Lines)."""
+    from openpyxl import Workbook
+
+    out = out or tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX)
+    wb = Workbook(write_only=True)
+    pos = _write_sheets(wb, "Purchase Orders", PO_HEADER, stream_po_history(supplier_id))
+    lines = _write_sheets(wb, "Lines", LINE_HEADER, stream_po_lines(supplier_id))
+    wb.save(out)
+    out.seek(0)
+    return out, {"pos": pos, "lines": lines}
+
+def export_history(supplier_id: int, fmt: str):
+    """fmt: "csv" | "xlsx" → (file, counts)."""
+    return (export_xlsx if fmt == "xlsx" else export_csv_zip)(supplier_id)
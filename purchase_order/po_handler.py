@@ -1,120 +1,589 @@
 # purchase_order/po_handler.py
-import base64, io
-from PIL import Image
+import re
+import threading
+import time
 
-from db_handler import get_db
+from psycopg2.extras import execute_values
 
-db = get_db()                     # ← cached DatabaseManager singleton
+from db_handler import LazyDatabase, statement
+from purchase_order.item_pictures import make_thumbnail, thumbnail_cache
+
+db = LazyDatabase()               # ← DatabaseManager singleton, built on first query
 # ----------------------------------------------------------------------
 # PO-level queries
 # ----------------------------------------------------------------------
-def get_purchase_orders_for_supplier(supplier_id: int):
-    q = """
-        SELECT POID, OrderDate, ExpectedDelivery, Status,
-               SupProposedDeliver, OriginalPOID, SupplierNote, RespondedAt
+# read-cache tags (tables each query reads) – see DatabaseManager.fetch
+_PO_TAGS   = ("purchaseorders",)
+_ITEM_TAGS = ("purchaseorderitems", "item")
+_KPI_TAGS  = ("supplier_po_kpis",)       # written by _po_update
+
+_PO_COLUMNS = """POID, OrderDate, ExpectedDelivery, Status,
+               SupProposedDeliver, OriginalPOID, SupplierNote, RespondedAt"""
+
+# KPI status sets – the same ones refresh_supplier_kpis() counts in
+# sql/004_supplier_kpis.sql; change both together.  A PO leaving Pending for a
+# response status is a response; reaching a delivered status is a delivery.
+_ACCEPTED_STATUSES  = "('Accepted', 'Shipping', 'Delivered', 'Completed')"
+_RESPONSE_STATUSES  = ("('Accepted', 'Shipping', 'Delivered', 'Completed', "
+                       "'Proposed by Supplier', 'Declined', 'Declined by Supplier')")
+_DELIVERED_STATUSES = "('Delivered', 'Completed')"
+
+def _po_update(set_clause: str) -> str:
+    """
+    One-PO UPDATE for the status writers.  Params: the POID first, then the
+    SET clause's.  In the same statement the status transition is folded
+    into the supplier's KPI row (sql/004_supplier_kpis.sql): a response to
+    a Pending PO (+ its response time the first time), a delivery (+ late
+    if past ExpectedDelivery).  sql/004 is a deploy prerequisite – without
+    the table every status write fails; a PO whose supplier row is missing
+    just skips the KPI upsert.
+    Hands back the new header (same keys as the reads) plus SupplierID and
+    the writing transaction's id – the "x" of the NOTIFY payload
+    (sql/003_po_change_notify.sql), so a session can skip its own echo.
+    """
+    return f"""
+        WITH old AS (
+            SELECT POID, Status, RespondedAt
+            FROM PurchaseOrders
+            WHERE POID = %s
+            FOR UPDATE
+        ), po AS (
+            UPDATE PurchaseOrders p
+            SET {set_clause}
+            FROM old
+            WHERE p.POID = old.POID
+            RETURNING p.*, old.Status AS OldStatus, old.RespondedAt AS OldRespondedAt,
+                      txid_current() AS TxID
+        ), t AS (
+            SELECT po.*,
+                   OldStatus = 'Pending' AND Status IN {_RESPONSE_STATUSES} AS responded,
+                   OldStatus NOT IN {_DELIVERED_STATUSES}
+                       AND Status IN {_DELIVERED_STATUSES}                 AS delivered
+            FROM po
+        ), kpi AS (
+            INSERT INTO supplier_po_kpis AS k
+                   (SupplierID, Responses, Accepted, Proposed, Declined,
+                    TimedResponses, ResponseSeconds, Delivered, DeliveredLate)
+            SELECT SupplierID,
+                   responded::int,
+                   (responded AND Status IN {_ACCEPTED_STATUSES})::int,
+                   (responded AND Status = 'Proposed by Supplier')::int,
+                   (responded AND Status IN ('Declined', 'Declined by Supplier'))::int,
+                   (responded AND OldRespondedAt IS NULL)::int,
+                   CASE WHEN responded AND OldRespondedAt IS NULL
+                        THEN EXTRACT(EPOCH FROM RespondedAt - OrderDate) ELSE 0 END,
+                   delivered::int,
+                   (delivered AND ExpectedDelivery IS NOT NULL
+                              AND RespondedAt > ExpectedDelivery)::int
+            FROM t
+            WHERE (responded OR delivered)
+              AND EXISTS (SELECT 1 FROM supplier s WHERE s.supplierid = t.SupplierID)
+            ON CONFLICT (SupplierID) DO UPDATE SET
+                Responses       = k.Responses       + EXCLUDED.Responses,
+                Accepted        = k.Accepted        + EXCLUDED.Accepted,
+                Proposed        = k.Proposed        + EXCLUDED.Proposed,
+                Declined        = k.Declined        + EXCLUDED.Declined,
+                TimedResponses  = k.TimedResponses  + EXCLUDED.TimedResponses,
+                ResponseSeconds = k.ResponseSeconds + EXCLUDED.ResponseSeconds,
+                Delivered       = k.Delivered       + EXCLUDED.Delivered,
+                DeliveredLate   = k.DeliveredLate   + EXCLUDED.DeliveredLate,
+                UpdatedAt       = NOW()
+        )
+        SELECT SupplierID, {_PO_COLUMNS}, TxID
+        FROM po
+    """
+_ITEM_RETURNING = """RETURNING poi.ItemID, poi.SupProposedQuantity,
+                  poi.SupProposedPrice, poi.SupExpirationDate"""
+
+# hot statements – PREPAREd once per pooled connection (db_handler.Statement)
+_PO_BY_ID = statement("po_by_id", f"""
+        SELECT {_PO_COLUMNS}
+        FROM PurchaseOrders
+        WHERE POID = %s
+""")
+_ACTIVE_POS = statement("po_active_for_supplier", f"""
+        SELECT {_PO_COLUMNS}
         FROM PurchaseOrders
         WHERE SupplierID = %s
           AND Status IN ('Pending','Accepted','Shipping')
         ORDER BY OrderDate DESC
+""")
+
+def get_purchase_order(poid: int):
+    """Single PO header (same columns as the list queries) or None."""
+    return db.fetch_one(_PO_BY_ID, (poid,), cache_tags=_PO_TAGS)
+
+def get_purchase_orders_for_supplier(supplier_id: int):
+    return db.fetch(_ACTIVE_POS, (supplier_id,), cache_tags=_PO_TAGS)
+
+def get_purchase_orders(poids) -> dict:
+    """{poid: PO header} for the given ids, in one query (missing ids are
+    simply absent)."""
+    poids = sorted({int(p) for p in poids})
+    if not poids:
+        return {}
+    q = f"""
+        SELECT {_PO_COLUMNS}
+        FROM PurchaseOrders
+        WHERE POID = ANY(%s)
+    """
+    return {r["poid"]: r for r in db.fetch(q, (poids,), cache_tags=_PO_TAGS)}
+
+ARCHIVED_STATUSES = ("Declined", "Declined by AMAS", "Declined by Supplier",
+                     "Delivered", "Completed")
+ARCHIVE_PAGE_SIZE = 25
+SEARCH_MAX_WORDS = 8
+
+_SEARCH_WORD = re.compile(r"\w+")
+
+def _search_clause(supplier_id, search):
+    """
+    "POID IN (…)" for the archive search box: POs of the supplier whose
+    supplier note or one of whose item names contains every word of
+    `search` (as a word prefix), or – for a plain number – that POID.
+    Each UNION branch starts from an index (sql/005_po_search_indexes.sql:
+    the full-text GIN indexes on notes and item names, then the lines by
+    ItemID), so the cost follows the number of matches, not the size of
+    the supplier's archive.  Returns (None, []) when there is nothing to
+    search for.
     """
-    return db.fetch(q, (supplier_id,))
+    words = _SEARCH_WORD.findall((search or "").casefold())[:SEARCH_MAX_WORDS]
+    if not words:
+        return None, []
+    # \w-only words → no tsquery operators can sneak in
+    tsquery = " & ".join(f"{w}:*" for w in words)
+    branches = ["""
+            SELECT POID FROM PurchaseOrders
+            WHERE SupplierID = %s
+              AND to_tsvector('simple', SupplierNote) @@ to_tsquery('simple', %s)""", """
+            SELECT poi.POID
+            FROM PurchaseOrderItems poi
+            JOIN PurchaseOrders p ON p.POID = poi.POID
+            WHERE p.SupplierID = %s
+              AND poi.ItemID IN (
+                  SELECT ItemID FROM Item
+                  WHERE to_tsvector('simple', ItemNameEnglish)
+                        @@ to_tsquery('simple', %s))"""]
+    params = [supplier_id, tsquery, supplier_id, tsquery]
+    # isdecimal, not isdigit: "²" is a digit but int() rejects it
+    if len(words) == 1 and words[0].isdecimal() and int(words[0]) < 2**31:
+        branches.append("""
+            SELECT %s::int""")
+        params.append(int(words[0]))
+    return f"POID IN ({' UNION ALL'.join(branches)})", params
 
-def get_archived_purchase_orders(supplier_id: int):
-    q = """
-        SELECT POID, OrderDate, ExpectedDelivery, Status,
-               SupProposedDeliver, OriginalPOID, SupplierNote, RespondedAt
+def _archived_where(supplier_id, statuses=None, date_from=None, date_to=None,
+                    search=None):
+    """WHERE clause + params shared by the archive queries."""
+    wanted = [s for s in (statuses or ARCHIVED_STATUSES) if s in ARCHIVED_STATUSES]
+    where = ["SupplierID = %s", "Status = ANY(%s)"]
+    params = [supplier_id, wanted or list(ARCHIVED_STATUSES)]
+    if date_from:
+        where.append("OrderDate >= %s")
+        params.append(date_from)
+    if date_to:                                 # inclusive calendar day
+        where.append("OrderDate < %s::date + 1")
+        params.append(date_to)
+    matches, match_params = _search_clause(supplier_id, search)
+    if matches:
+        where.append(matches)
+        params += match_params
+    return " AND ".join(where), params
+
+def _archive_tags(search):
+    """A search also reads the lines and item names."""
+    return _PO_TAGS + _ITEM_TAGS if search else _PO_TAGS
+
+def get_archived_purchase_orders(supplier_id: int, statuses=None,
+                                 date_from=None, date_to=None, search=None):
+    """Every archived PO matching the filters (unpaginated)."""
+    where, params = _archived_where(supplier_id, statuses, date_from, date_to,
+                                    search)
+    q = f"""
+        SELECT {_PO_COLUMNS}
         FROM PurchaseOrders
-        WHERE SupplierID = %s
-          AND Status IN ('Declined','Declined by AMAS','Declined by Supplier',
-                         'Delivered','Completed')
-        ORDER BY OrderDate DESC
+        WHERE {where}
+        ORDER BY OrderDate DESC, POID DESC
     """
-    return db.fetch(q, (supplier_id,))
+    return db.fetch(q, params, cache_tags=_archive_tags(search))
+
+def get_archived_po_page(
+    supplier_id: int,
+    after=None,
+    statuses=None,
+    date_from=None,
+    date_to=None,
+    page_size: int = ARCHIVE_PAGE_SIZE,
+    search=None,
+):
+    """
+    One keyset page of archived POs, newest first.
+    `after` is the (OrderDate, POID) cursor returned by the previous page.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    Served by index idx_po_supplier_orderdate (sql/001_po_keyset_index.sql);
+    `search` keeps only matching POs (see _search_clause).
+    """
+    where, params = _archived_where(supplier_id, statuses, date_from, date_to,
+                                    search)
+    if after is not None:
+        where += " AND (OrderDate, POID) < (%s, %s)"
+        params += list(after)
+    q = f"""
+        SELECT {_PO_COLUMNS}
+        FROM PurchaseOrders
+        WHERE {where}
+        ORDER BY OrderDate DESC, POID DESC
+        LIMIT %s
+    """
+    rows = db.fetch(q, params + [page_size + 1],   # +1 → is there a next page?
+                    cache_tags=_archive_tags(search))
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, (rows[-1]["orderdate"], rows[-1]["poid"])
 
 def update_purchase_order_status(
     poid: int, status: str, expected_delivery=None, supplier_note=None
 ):
-    q = """
-        UPDATE PurchaseOrders
-        SET Status = %s,
+    """Set the status; returns the updated PO header (see _po_update)."""
+    q = _po_update("""
+            Status = %s,
             ExpectedDelivery = COALESCE(%s, ExpectedDelivery),
             SupplierNote     = COALESCE(%s, SupplierNote),
             RespondedAt      = NOW()
-        WHERE POID = %s
-    """
-    db.execute(q, (status, expected_delivery, supplier_note, poid))
+    """)
+    row = db.execute(q, (poid, status, expected_delivery, supplier_note),
+                     returning=True)
+    if row:
+        invalidate_po_summary(row["supplierid"])
+    return row
 
 def propose_entire_po(poid: int, sup_proposed_deliver=None, supplier_note=None):
-    q = """
-        UPDATE PurchaseOrders
-        SET Status            = 'Proposed by Supplier',
+    q = _po_update("""
+            Status             = 'Proposed by Supplier',
             SupProposedDeliver = COALESCE(%s, SupProposedDeliver),
             SupplierNote       = COALESCE(%s, SupplierNote),
             RespondedAt        = NOW()
-        WHERE POID = %s
+    """)
+    row = db.execute(q, (poid, sup_proposed_deliver, supplier_note),
+                     returning=True)
+    if row:
+        invalidate_po_summary(row["supplierid"])
+    return row
+
+# ----------------------------------------------------------------------
+# Status summary (sidebar badge) – one GROUP BY, memoised per supplier
+# ----------------------------------------------------------------------
+SUMMARY_TTL = 30.0                 # seconds; writes invalidate explicitly
+
+_summary_cache: dict = {}          # (supplier_id, with_totals) → (expires, summary)
+_summary_lock = threading.Lock()
+
+def get_po_status_summary(supplier_id: int, with_totals: bool = False) -> dict:
+    """
+    {status: {"count": n[, "total": Σ qty × est. price]}} for one supplier.
+    Served from a short-TTL per-process memo; PO writes drop the entry.
     """
-    db.execute(q, (sup_proposed_deliver, supplier_note, poid))
+    key = (supplier_id, with_totals)
+    now = time.monotonic()
+    with _summary_lock:
+        hit = _summary_cache.get(key)
+        if hit and hit[0] > now:
+            return hit[1]
+
+    if with_totals:
+        q = """
+            SELECT po.Status,
+                   COUNT(DISTINCT po.POID)    AS count,
+                   COALESCE(SUM(poi.OrderedQuantity
+                                * COALESCE(poi.EstimatedPrice, 0)), 0) AS total
+            FROM PurchaseOrders po
+            LEFT JOIN PurchaseOrderItems poi ON poi.POID = po.POID
+            WHERE po.SupplierID = %s      -- filter first: only this supplier's lines
+            GROUP BY po.Status
+        """
+    else:
+        q = """
+            SELECT Status, COUNT(*) AS count
+            FROM PurchaseOrders
+            WHERE SupplierID = %s
+            GROUP BY Status
+        """
+    summary = {
+        r["status"]: {k: v for k, v in r.items() if k != "status"}
+        for r in db.fetch(q, (supplier_id,))
+    }
+    with _summary_lock:
+        _summary_cache[key] = (now + SUMMARY_TTL, summary)
+    return summary
+
+def invalidate_po_summary(supplier_id: int) -> None:
+    with _summary_lock:
+        for key in [k for k in _summary_cache if k[0] == supplier_id]:
+            del _summary_cache[key]
+
+def invalidate_po_reads(supplier_ids) -> None:
+    """Drop cached PO / item reads and the given suppliers' summaries after
+    a change made outside this process (see po_events)."""
+    db.cache.invalidate(_PO_TAGS + _ITEM_TAGS)
+    for supplier_id in supplier_ids:
+        invalidate_po_summary(supplier_id)
 
 # ----------------------------------------------------------------------
 # Item-level helpers  (includes SupExpirationDate)
 # ----------------------------------------------------------------------
-def get_purchase_order_items(poid: int):
-    """
-    Returns list[dict]; each item includes base64 data-URI in 'itempicture'.
-    """
-    q = """
-        SELECT i.ItemID,
-               i.ItemNameEnglish,
-               encode(i.ItemPicture,'base64') AS ItemPicture,
-               poi.OrderedQuantity,
-               poi.EstimatedPrice,
-               poi.SupProposedQuantity,
-               poi.SupProposedPrice,
-               poi.SupExpirationDate
+_ITEM_COLUMNS = """
+        poi.POID,
+        i.ItemID,
+        i.ItemNameEnglish,
+        CASE WHEN i.ItemPicture IS NOT NULL
+             THEN i.xmin::text END AS PictureVersion,
+        poi.OrderedQuantity,
+        poi.EstimatedPrice,
+        poi.SupProposedQuantity,
+        poi.SupProposedPrice,
+        poi.SupExpirationDate
+"""
+_ITEMS_FOR_POS = statement("po_items_for_pos", f"""
+        SELECT {_ITEM_COLUMNS}
         FROM PurchaseOrderItems poi
         JOIN Item i ON poi.ItemID = i.ItemID
-        WHERE poi.POID = %s
+        WHERE poi.POID = ANY(%s)
+        ORDER BY poi.POID, i.ItemID
+""")
+
+def get_purchase_order_items(poid: int):
+    """
+    Returns list[dict].  Rows carry only 'pictureversion' (the Item row's
+    xmin, None when there is no picture); use `get_item_thumbnails` for images.
     """
-    rows = db.fetch(q, (poid,))
-    if not rows:
-        return []
+    return get_items_for_purchase_orders([poid]).get(poid, [])
+
+def get_items_for_purchase_orders(poids) -> dict:
+    """
+    Fetch the lines of many POs in ONE query.
+    Returns {poid: list[dict]}; POs without lines are absent from the dict.
+    """
+    poids = list(poids)
+    if not poids:
+        return {}
+
+    grouped: dict = {}
+    for itm in db.fetch(_ITEMS_FOR_POS, (poids,), cache_tags=_ITEM_TAGS):
+        grouped.setdefault(itm["poid"], []).append(itm)
+    return grouped
+
+# display names of _ITEM_COLUMNS, in SELECT order (fetch_df)
+ITEM_TABLE_COLUMNS = ("POID", "ItemID", "Item Name", "PictureVersion",
+                      "OrderedQty", "EstPrice", "SupQty", "SupPrice",
+                      "SupExpDate")
+# nullable ints stay ints (not float64 with NaN) – see proposal_upload.template_csv
+ITEM_TABLE_DTYPES = {"OrderedQty": "Int64", "SupQty": "Int64"}
 
-    for itm in rows:                              # convert raw to data-URI
-        raw = itm["itempicture"]
-        if not raw:
+def get_item_tables(poids) -> dict:
+    """
+    Lines of many POs as display-ready DataFrames, {poid: frame}, from ONE
+    query built column-wise (no per-row dicts).  Columns: ITEM_TABLE_COLUMNS
+    minus POID; POs without lines are absent.
+    """
+    poids = list(poids)
+    if not poids:
+        return {}
+    return db.fetch_df(_ITEMS_FOR_POS, (poids,), columns=ITEM_TABLE_COLUMNS,
+                       group_by="POID", dtypes=ITEM_TABLE_DTYPES)
+
+# item-table column ← key of the rows returned by the proposal writers
+_SUP_COLUMNS = {"SupQty":     "supproposedquantity",
+                "SupPrice":   "supproposedprice",
+                "SupExpDate": "supexpirationdate"}
+
+def patch_item_table(frame, items):
+    """
+    Copy of a `get_item_tables` frame with the Sup* columns of the lines in
+    `items` (rows returned by update_po_item_proposals / apply_proposal_upload)
+    replaced – lets a page show a write without reading the PO back.
+    """
+    if frame is None or not items:
+        return frame
+    by_id = {r["itemid"]: r for r in items}
+    frame = frame.copy()
+    hit = frame["ItemID"].isin(list(by_id))
+    ids = frame.loc[hit, "ItemID"]
+    for col, key in _SUP_COLUMNS.items():
+        frame[col] = frame[col].astype(object)    # values may be None / dates
+        frame.loc[hit, col] = [by_id[i][key] for i in ids]
+    return frame
+
+def get_item_thumbnails(keys) -> dict:
+    """
+    Return {itemid: data-URI} for (itemid, picture version) pairs – e.g.
+    zip(frame["ItemID"], frame["PictureVersion"]).
+    Thumbnails are built once per (ItemID, picture version) and served from the
+    LRU cache afterwards; only cache misses pull picture bytes, in one query.
+    """
+    thumbs, missing = {}, {}
+    for itemid, version in keys:
+        if version is None:
             continue
-        try:
-            img_bytes = base64.b64decode(raw)
-            img = Image.open(io.BytesIO(img_bytes))
-            fmt = (img.format or "PNG").lower()
-            buf = io.BytesIO(); img.save(buf, format=img.format or "PNG")
-            itm["itempicture"] = (
-                f"data:image/{'jpeg' if fmt in ('jpeg','jpg') else 'png'};"
-                f"base64,{base64.b64encode(buf.getvalue()).decode()}"
-            )
-        except Exception:
-            itm["itempicture"] = None
-    return rows
+        itemid = int(itemid)              # numpy ints from a frame column
+        key = (itemid, version)
+        cached = thumbnail_cache.get(key)
+        if cached is None:
+            missing[itemid] = key
+        elif cached:                      # "" = picture is not an image
+            thumbs[itemid] = cached
+
+    if missing:
+        q = """
+            SELECT ItemID, ItemPicture, xmin::text AS PictureVersion
+            FROM Item
+            WHERE ItemID = ANY(%s)
+        """
+        for row in db.fetch(q, (list(missing),)):
+            uri = make_thumbnail(bytes(row["itempicture"] or b"")) or ""
+            # key on the version we just read, in case the row changed
+            thumbnail_cache.put((row["itemid"], row["pictureversion"]), uri)
+            if uri:
+                thumbs[row["itemid"]] = uri
+    return thumbs
+
+# PO-level half of a supplier response (shared by the item-proposal writers)
+_PO_RESPONSE_UPDATE = _po_update("""
+            Status             = %s,
+            ExpectedDelivery   = COALESCE(%s, ExpectedDelivery),
+            SupProposedDeliver = COALESCE(%s, SupProposedDeliver),
+            SupplierNote       = COALESCE(%s, SupplierNote),
+            RespondedAt        = NOW()
+""")
 
 def update_po_item_proposal(
     poid: int, itemid: int, sup_qty=None, sup_price=None, sup_exp_date=None
 ):
-    # First: update the item row
-    q_item = """
-        UPDATE PurchaseOrderItems
-        SET SupProposedQuantity = COALESCE(%s, SupProposedQuantity),
-            SupProposedPrice    = COALESCE(%s, SupProposedPrice),
-            SupExpirationDate   = COALESCE(%s, SupExpirationDate)
-        WHERE POID = %s
-          AND ItemID = %s
+    """Single-item convenience wrapper around `update_po_item_proposals`."""
+    return update_po_item_proposals(poid, [(itemid, sup_qty, sup_price, sup_exp_date)])
+
+def update_po_item_proposals(
+    poid: int,
+    items,
+    status: str = "Proposed by Supplier",
+    *,
+    expected_delivery=None,
+    sup_proposed_deliver=None,
+    supplier_note=None,
+):
     """
-    db.execute(q_item, (sup_qty, sup_price, sup_exp_date, poid, itemid))
+    Apply many item proposals + the PO status change in ONE transaction.
 
-    # Second: mark the PO as "Proposed by Supplier"
-    q_po = """
-        UPDATE PurchaseOrders
-        SET Status      = 'Proposed by Supplier',
-            RespondedAt = NOW()
-        WHERE POID = %s
+    `items` is an iterable of (itemid, sup_qty, sup_price, sup_exp_date);
+    None keeps the current value.  All rows go out in a single set-based
+    UPDATE … FROM (VALUES …), so a 200-line PO costs two statements and one
+    commit instead of 400 round trips.
+    Returns (po, items): the updated header (see _po_update) and the
+    updated lines (itemid + the three Sup* columns) for `patch_item_table`.
+    """
+    items = list(items)
+
+    q_items = f"""
+        UPDATE PurchaseOrderItems AS poi
+        SET SupProposedQuantity = COALESCE(v.qty,   poi.SupProposedQuantity),
+            SupProposedPrice    = COALESCE(v.price, poi.SupProposedPrice),
+            SupExpirationDate   = COALESCE(v.exp,   poi.SupExpirationDate)
+        FROM (VALUES %s) AS v(poid, itemid, qty, price, exp)
+        WHERE poi.POID   = v.poid
+          AND poi.ItemID = v.itemid
+        {_ITEM_RETURNING}
     """
-    db.execute(q_po, (poid,))
+    updated = []
+    with db.transaction(invalidates=_PO_TAGS + _ITEM_TAGS + _KPI_TAGS) as cur:
+        if items:
+            updated = execute_values(
+                cur, q_items,
+                [(poid, iid, qty, price, exp) for iid, qty, price, exp in items],
+                template="(%s::int, %s::int, %s::int, %s::numeric, %s::date)",
+                page_size=len(items),       # one statement for the whole PO
+                fetch=True,
+            )
+        cur.execute(_PO_RESPONSE_UPDATE, (poid, status, expected_delivery,
+                                          sup_proposed_deliver, supplier_note))
+        row = cur.fetchone()
+    if row:
+        invalidate_po_summary(row["supplierid"])
+    return row, updated
+
+def apply_proposal_upload(
+    poid: int,
+    copy_data,
+    status: str = "Proposed by Supplier",
+    *,
+    sup_proposed_deliver=None,
+    supplier_note=None,
+) -> tuple:
+    """
+    Bulk variant of `update_po_item_proposals` for uploaded CSVs.
+    `copy_data` is a file-like in COPY text format (itemid, qty, price, exp;
+    empty = keep current) – see proposal_upload.parse_proposal_csv.  It is
+    COPYed into a temp table and applied with ONE set-based UPDATE plus the
+    PO status change, in one transaction.  Returns (po, items) like
+    `update_po_item_proposals`.
+    """
+    q_items = f"""
+        UPDATE PurchaseOrderItems AS poi
+        SET SupProposedQuantity = COALESCE(u.qty,   poi.SupProposedQuantity),
+            SupProposedPrice    = COALESCE(u.price, poi.SupProposedPrice),
+            SupExpirationDate   = COALESCE(u.exp,   poi.SupExpirationDate)
+        FROM po_proposal_upload u
+        WHERE poi.POID   = %s
+          AND poi.ItemID = u.itemid
+        {_ITEM_RETURNING}
+    """
+    with db.transaction(invalidates=_PO_TAGS + _ITEM_TAGS + _KPI_TAGS) as cur:
+        cur.execute("""
+            CREATE TEMP TABLE po_proposal_upload (
+                itemid int PRIMARY KEY, qty int, price numeric, exp date
+            ) ON COMMIT DROP
+        """)
+        cur.copy_expert("COPY po_proposal_upload (itemid, qty, price, exp) "
+                        "FROM STDIN", copy_data)
+        cur.execute(q_items, (poid,))
+        updated = cur.fetchall()
+        cur.execute(_PO_RESPONSE_UPDATE, (poid, status, None,
+                                          sup_proposed_deliver, supplier_note))
+        row = cur.fetchone()
+    if row:
+        invalidate_po_summary(row["supplierid"])
+    return row, updated
+
+# ----------------------------------------------------------------------
+# Full history export (server-side cursors – see po_export.py)
+# ----------------------------------------------------------------------
+_EXPORT_PO_SQL = f"""
+    SELECT {_PO_COLUMNS}
+    FROM PurchaseOrders
+    WHERE SupplierID = %s
+    ORDER BY OrderDate, POID
+"""
+_EXPORT_LINES_SQL = """
+    SELECT poi.POID,
+           po.OrderDate,
+           po.Status,
+           i.ItemID,
+           i.ItemNameEnglish,
+           poi.OrderedQuantity,
+           poi.EstimatedPrice,
+           poi.SupProposedQuantity,
+           poi.SupProposedPrice,
+           poi.SupExpirationDate
+    FROM PurchaseOrderItems poi
+    JOIN PurchaseOrders po ON po.POID = poi.POID
+    JOIN Item i            ON i.ItemID = poi.ItemID
+    WHERE po.SupplierID = %s
+    ORDER BY po.OrderDate, poi.POID, i.ItemID
+"""
+
+def stream_po_history(supplier_id: int):
+    """Context manager → (column names, row iterator) over every PO header."""
+    return db.stream(_EXPORT_PO_SQL, (supplier_id,))
+
+def stream_po_lines(supplier_id: int):
+    """Context manager → (column names, row iterator) over every PO line."""
+    return db.stream(_EXPORT_LINES_SQL, (supplier_id,))
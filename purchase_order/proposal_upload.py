@@ -0,0 +1,153 @@
+"""
+purchase_order/proposal_upload.py
+Bulk Modify proposals from a CSV of (ItemID, qty, price, expiration).
+One pass over the file validates every row and writes the clean ones in
+COPY text format for `po_handler.apply_proposal_upload`.
+"""
+
+import csv
+import datetime
+import io
+from decimal import Decimal, InvalidOperation
+
+import pandas as pd
+
+# canonical column → accepted header spellings (lower-case, no spaces / _)
+HEADER_ALIASES = {
+    "itemid":     ("itemid", "item"),
+    "qty":        ("qty", "quantity", "supqty", "proposedqty"),
+    "price":      ("price", "supprice", "proposedprice"),
+    "expiration": ("expiration", "exp", "expdate", "expirationdate", "supexpdate"),
+}
+TEMPLATE_HEADER = ("ItemID", "Item Name", "qty", "price", "expiration")
+MAX_ERRORS = 20                  # stop collecting after this many
+MAX_BYTES = 5 * 1024 * 1024
+
+def _norm(name: str) -> str:
+    return name.strip().lower().replace(" ", "").replace("_", "")
+
+def _columns(header) -> dict | None:
+    """canonical name → column index, or None when ItemID is missing."""
+    found = {}
+    for idx, name in enumerate(header):
+        for canon, aliases in HEADER_ALIASES.items():
+            if _norm(name) in aliases and canon not in found:
+                found[canon] = idx
+    return found if "itemid" in found else None
+
+def _cell(row, idx):
+    return row[idx].strip() if idx is not None and idx < len(row) else ""
+
+def parse_proposal_csv(data: bytes, allowed_items):
+    """
+    Validate an uploaded CSV against the PO's item ids.
+    Returns (copy_buffer, row_count, errors); `errors` is a list of
+    (line, code, value) – codes map to "upload_err_<code>" translations.
+    Blank qty / price / expiration keep the current value; extra columns
+    (e.g. the template's "Item Name") are ignored.
+    """
+    out, errors, seen = io.StringIO(), [], set()
+
+    def fail(line, code, value=""):
+        errors.append((line, code, value))
+        return len(errors) >= MAX_ERRORS
+
+    if len(data) > MAX_BYTES:
+        fail(0, "size", f"{MAX_BYTES // (1024 * 1024)} MB")
+        return out, 0, errors
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        fail(0, "encoding")
+        return out, 0, errors
+
+    reader = csv.reader(io.StringIO(text))
+    cols = _columns(next(reader, []))
+    if cols is None:
+        fail(1, "header", ", ".join(HEADER_ALIASES))
+        return out, 0, errors
+
+    count = 0
+    for line, row in enumerate(reader, start=2):
+        if not any(cell.strip() for cell in row):
+            continue                                   # blank line
+        raw_id = _cell(row, cols["itemid"])
+        qty_s, price_s, exp_s = (_cell(row, cols.get(k))
+                                 for k in ("qty", "price", "expiration"))
+        try:
+            itemid = int(raw_id)
+        except ValueError:
+            if fail(line, "itemid", raw_id):
+                break
+            continue
+        if itemid not in allowed_items:
+            if fail(line, "unknown_item", raw_id):
+                break
+            continue
+        if itemid in seen:
+            if fail(line, "duplicate", raw_id):
+                break
+            continue
+
+        qty = price = exp = None
+        try:
+            if qty_s:
+                qty = int(qty_s)
+                if qty < 0:
+                    raise ValueError
+        except ValueError:
+            if fail(line, "qty", qty_s):
+                break
+            continue
+        try:
+            if price_s:
+                price = Decimal(price_s)
+                if not price.is_finite() or price < 0:
+                    raise InvalidOperation
+        except InvalidOperation:
+            if fail(line, "price", price_s):
+                break
+            continue
+        try:
+            if exp_s:
+                exp = datetime.date.fromisoformat(exp_s)
+        except ValueError:
+            if fail(line, "date", exp_s):
+                break
+            continue
+        seen.add(itemid)
+        if qty is None and price is None and exp is None:
+            continue                                   # nothing to change
+
+        out.write("\t".join("\\N" if v is None else str(v)
+                            for v in (itemid, qty, price, exp)) + "\n")
+        count += 1
+
+    if not errors and not count:
+        fail(0, "empty")
+    out.seek(0)
+    return out, count, errors
+
+def _first(*values):
+    """First value that is not None / NaN / NaT (table cells), else None."""
+    return next((v for v in values if v is not None and not pd.isna(v)), None)
+
+def template_csv(table) -> bytes:
+    """Pre-filled CSV for a PO from its item table (po_handler.get_item_tables):
+    current proposal (or ordered) values, written in the forms
+    `parse_proposal_csv` accepts – so an unchanged template uploads cleanly."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(TEMPLATE_HEADER)
+    rows = zip(table["ItemID"], table["Item Name"], table["SupQty"],
+               table["OrderedQty"], table["SupPrice"], table["EstPrice"],
+               table["SupExpDate"])
+    for itemid, name, sup_qty, qty, sup_price, price, exp in rows:
+        qty, price, exp = _first(sup_qty, qty), _first(sup_price, price), _first(exp)
+        writer.writerow((
+            int(itemid), name,
+            "" if qty is None else int(qty),
+            "" if price is None else f"{Decimal(str(price)):.2f}",
+            "" if exp is None else pd.Timestamp(exp).date().isoformat(),
+        ))
+    return buf.getvalue().encode("utf-8-sig")
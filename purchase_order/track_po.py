@@ -1,21 +1,116 @@
 # purchase_order/track_po.py
 import streamlit as st
-import pandas as pd
 import datetime
+from streamlit.errors import StreamlitAPIException
 from translation import _
+from db_handler import get_db
+from purchase_order.archived_po import ARCH_WINDOW_STATE
 from purchase_order.po_handler import (
+    get_purchase_orders,
     get_purchase_orders_for_supplier,
-    get_purchase_order_items,
-    update_po_item_proposal,
+    get_item_tables,
+    get_item_thumbnails,
+    patch_item_table,
+    apply_proposal_upload,
+    update_po_item_proposals,
     update_purchase_order_status,
-    propose_entire_po,
 )
+from purchase_order.item_grid import GRID_COLUMNS, READ_ONLY, grid_changes, proposal_grid
+from purchase_order.po_events import get_po_events
+from purchase_order.proposal_upload import parse_proposal_csv, template_csv
+
+PO_STATE    = "track_po_rows"     # {poid: latest PO header}
+ITEMS_STATE = "track_po_items"    # {poid: item DataFrame | None}, opened cards only
+LIVE_STATE  = "track_po_live"     # this session's po_events.Subscription
+UNMERGED_STATE = "track_po_unmerged"  # drained POIDs not applied yet (None = full reload)
+LIVE_POLL_SECONDS = 5             # how often an open page checks its inbox
+ACTIVE_STATUSES = ("Pending", "Accepted", "Shipping")
+TABLE_COLUMNS = ("ItemID", "Item Name", "OrderedQty", "EstPrice",
+                 "SupQty", "SupPrice", "SupExpDate")
 
 # -----------------------------------------------------------------------------
-def show_purchase_orders_page(supplier):
+def _live_subscription(supplier_id):
+    """This session's inbox on the PO event bus, or None when the NOTIFY
+    listener is off / disconnected (the page then reloads everything)."""
+    bus = get_po_events()
+    if not bus.live:
+        return None
+    sub = st.session_state.get(LIVE_STATE)
+    if sub is None or sub.supplier_id != supplier_id:
+        sub = st.session_state[LIVE_STATE] = bus.subscribe(supplier_id)
+    return sub
+
+def _take_changes(sub):
+    """
+    Drain the inbox, plus whatever an earlier run drained but never applied
+    (it ended early – e.g. a sidebar button's st.rerun()).  Held in
+    UNMERGED_STATE until `show_purchase_orders_page` has applied it.
+    None = reload everything.
+    """
+    if sub is None:
+        return None
+    changed = sub.drain()
+    held = st.session_state.get(UNMERGED_STATE, set())
+    changed = None if changed is None or held is None else held | changed
+    st.session_state[UNMERGED_STATE] = changed
+    return changed
+
+def prefetch_track_po(supplier):
+    """
+    Start this page's reads concurrently: the active PO list and the items of
+    every card left open (known from the toggle keys, before the list is in).
+    With live updates, a session that already holds its PO list only reloads
+    the POs changed since its last run.
+    Returns (po_future, items_future, changed) for `show_purchase_orders_page`;
+    `changed` is None for a full load, else the POIDs po_future reloads.
+    """
+    open_ids = [int(k[5:]) for k, v in st.session_state.items()
+                if v is True and k.startswith("open_") and k[5:].isdigit()]
+    db = get_db()
+    sub = _live_subscription(supplier["supplierid"])
+    changed = _take_changes(sub)                          # drain BEFORE reading
+    if changed is None or PO_STATE not in st.session_state:
+        return (db.submit(get_purchase_orders_for_supplier, supplier["supplierid"]),
+                db.submit(get_item_tables, open_ids), None)
+
+    tables = st.session_state.setdefault(ITEMS_STATE, {})
+    for poid in changed:
+        tables.pop(poid, None)
+    missing = [poid for poid in open_ids if poid not in tables]
+    return (db.submit(get_purchase_orders, changed),
+            db.submit(get_item_tables, missing), changed)
+
+def _merge_changes(changed, rows):
+    """Apply reloaded POs to the session's list; returns it newest first.
+    POs this session moved out of the active statuses itself (their echo is
+    ignored, see _refresh_card) leave the list here too."""
+    current = st.session_state[PO_STATE]
+    for poid in changed:
+        po = rows.get(poid)
+        if po is not None and po["status"] in ACTIVE_STATUSES:
+            current[poid] = po
+        elif current.pop(poid, None) is not None:
+            st.session_state.pop(ARCH_WINDOW_STATE, None)   # it moved there
+    po_list = sorted((po for po in current.values()
+                      if po["status"] in ACTIVE_STATUSES),
+                     key=lambda po: po["orderdate"], reverse=True)
+    st.session_state[PO_STATE] = {po["poid"]: po for po in po_list}
+    return po_list
+
+@st.fragment(run_every=LIVE_POLL_SECONDS)
+def _live_updates(supplier_id):
+    """Invisible poller: a full rerun only when this supplier's POs changed
+    (the rerun then reloads just those POs)."""
+    sub = st.session_state.get(LIVE_STATE)
+    if sub is not None and sub.supplier_id == supplier_id and sub.pending():
+        st.rerun()
+
+def show_purchase_orders_page(supplier, prefetched=None):
     """Active PO page with Accept / Modify / Decline.
        * Accept flow collects per‑item expiration dates.
        * Modify flow lets user propose qty / price / expiration / note / delivery.
+       Each PO is its own fragment: clicks inside a card rerun only that card.
+       `prefetched` – futures from `prefetch_track_po`, started earlier.
     """
 
     st.subheader(_("track_po_header"))
@@ -24,163 +119,260 @@ def show_purchase_orders_page(supplier):
     st.session_state.setdefault("modify_po_show_form", {})
     st.session_state.setdefault("accept_po_show_exp", {})
 
-    po_list = get_purchase_orders_for_supplier(supplier["supplierid"])
+    # PO list (or just the changed POs) + items of open cards – in parallel
+    po_future, items_future, changed = prefetched or prefetch_track_po(supplier)
+    if LIVE_STATE in st.session_state:
+        _live_updates(supplier["supplierid"])
+    if changed is None:
+        po_list, tables = po_future.result(), items_future.result()
+        held = st.session_state.get(PO_STATE, {})
+        st.session_state[PO_STATE] = {po["poid"]: po for po in po_list}
+        if held.keys() - st.session_state[PO_STATE].keys():
+            st.session_state.pop(ARCH_WINDOW_STATE, None)   # some moved there
+    else:
+        po_list = _merge_changes(changed, po_future.result())
+        tables = {**st.session_state[ITEMS_STATE], **items_future.result()}
+    st.session_state.pop(UNMERGED_STATE, None)      # applied
     if not po_list:
         st.info(_("no_active_pos"))
         return
 
+    open_ids = [po["poid"] for po in po_list if st.session_state.get(f"open_{po['poid']}")]
+    st.session_state[ITEMS_STATE] = {poid: tables.get(poid) for poid in open_ids}
+
     # -------------------------------------------------------------------------
     for po in po_list:
-        poid = po["poid"]
-
-        with st.expander(_("po_expander", id=poid, status=po['status'])):
-            # ----- Basic info
-            st.write(_("order_date", date=po['orderdate']))
-            st.write(_("expected_delivery", date=po['expecteddelivery'] or _('not_set')))
-            st.write(_("current_status", status=po['status']))
-            st.write(_("supplier_note", note=po.get('suppliernote') or ''))
-
-            # ----- Items (read‑only table)
-            items = get_purchase_order_items(poid)
-            if items:
-                rows = [{
-                    "ItemID": it["itemid"],
-                    "Item Name": it["itemnameenglish"],
-                    "OrderedQty": it["orderedquantity"],
-                    "EstPrice":  it["estimatedprice"] or "N/A",
-                    "SupQty":     it.get("supproposedquantity") or "",
-                    "SupPrice":   it.get("supproposedprice") or "",
-                    "SupExpDate": it.get("supexpirationdate") or "",
-                } for it in items]
-                st.dataframe(pd.DataFrame(rows))
-            else:
-                st.info(_("no_items_found_po"))
-
-            # ==================================================================
-            #                          PENDING ACTIONS
-            # ==================================================================
-            if po["status"] == "Pending":
-                c1, c2, c3 = st.columns(3)
-
-                # ---------------- Accept Order ----------------
-                with c1:
-                    if not st.session_state["accept_po_show_exp"].get(poid):
-                        if st.button(_("accept_order_btn"), key=f"accept_{poid}"):
-                            st.session_state["accept_po_show_exp"][poid] = True
-                            st.rerun()
-                    else:
-                        st.subheader(_("enter_expiration"))
-                        exp_dates = {}
-                        for it in items:
-                            iid = it["itemid"]
-                            default_exp = it.get("supexpirationdate") or datetime.date.today()
-                            exp_dates[iid] = st.date_input(
-                                _( "item_expiration", id=iid ), value=default_exp,
-                                key=f"acc_exp_{poid}_{iid}"
-                            )
+        _po_card(po["poid"])
+
+# -----------------------------------------------------------------------------
+def _card_table(poid):
+    """Item table of an opened card (None = no lines); loaded lazily on a
+    fragment-only rerun and kept in session state."""
+    cache = st.session_state.setdefault(ITEMS_STATE, {})
+    if poid not in cache:
+        cache[poid] = get_item_tables([poid]).get(poid)
+    return cache[poid]
+
+def _item_grid(poid, table, kind):
+    """
+    One editable grid over the PO lines (instead of widgets per line) inside
+    the Accept / Modify form → (grid as shown, grid as edited).
+    kind: "acc" edits the expiration only, "mod" qty / price / expiration.
+    """
+    base = proposal_grid(table)
+    config = {
+        "Qty":        st.column_config.NumberColumn(_("qty_label"), min_value=0,
+                                                    step=1, format="%d"),
+        "Price":      st.column_config.NumberColumn(_("price_label"), min_value=0.0,
+                                                    step=0.1, format="%.2f"),
+        "Expiration": st.column_config.DateColumn(_("expiration_label")),
+    }
+    order = GRID_COLUMNS
+    if kind == "acc":
+        order = ("ItemID", "Item Name", "OrderedQty", "Expiration")
+    edited = st.data_editor(base, key=f"{kind}_grid_{poid}", hide_index=True,
+                            num_rows="fixed", disabled=READ_ONLY,
+                            column_order=order, column_config=config,
+                            use_container_width=True)
+    return base, edited
+
+def _apply_upload(poid, table, upload, deliver, note):
+    """Validate an uploaded proposal CSV and apply it → the writer's (po, items),
+    or None: on any error nothing is written and the problems are listed
+    under the form."""
+    buf, _count, errors = parse_proposal_csv(upload.getvalue(),
+                                             {int(i) for i in table["ItemID"]})
+    if errors:
+        for line, code, value in errors:
+            st.error(_(f"upload_err_{code}", line=line, value=value))
+        return None
+    written = apply_proposal_upload(poid, buf, sup_proposed_deliver=deliver,
+                                    supplier_note=note)
+    st.toast(_("upload_applied", n=len(written[1])))
+    return written
+
+def _rerun_card():
+    """Rerun only the current card; fall back to a full run if the click
+    was processed during a full-app run (fragment scope is refused there)."""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+def _refresh_card(poid, po, items=None):
+    """
+    Patch this session's copy of one PO from what the writer RETURNed – the
+    new header and, for proposals, the changed lines – and rerun just its
+    fragment.  No follow-up reads; the NOTIFY echo of the write is ignored.
+    """
+    if po is None:                                  # deleted meanwhile
+        st.session_state[PO_STATE].pop(poid, None)
+    else:
+        sub = st.session_state.get(LIVE_STATE)
+        txid = po.pop("txid", None)
+        if sub is not None:
+            sub.ignore(txid)
+        st.session_state[PO_STATE][poid] = po
+    tables = st.session_state.get(ITEMS_STATE, {})
+    if items and poid in tables:
+        tables[poid] = patch_item_table(tables[poid], items)
+    if po is None or po["status"] not in ACTIVE_STATUSES:
+        st.session_state.pop(ARCH_WINDOW_STATE, None)   # archive reloads page 1
+    _rerun_card()
+
+@st.fragment
+def _po_card(poid):
+    po = st.session_state[PO_STATE].get(poid)
+    if po is None:
+        return
+
+    with st.container(border=True):
+        st.markdown(f"**{_('po_expander', id=poid, status=po['status'])}**")
+
+        if po["status"] not in ACTIVE_STATUSES:
+            # just left the active list – it shows up under Archived next run
+            st.info(_("po_moved_msg", status=po["status"]))
+            return
+
+        if not st.toggle(_("show_details"), key=f"open_{poid}"):
+            return
+
+        # ----- Basic info
+        st.write(_("order_date", date=po['orderdate']))
+        st.write(_("expected_delivery", date=po['expecteddelivery'] or _('not_set')))
+        st.write(_("current_status", status=po['status']))
+        st.write(_("supplier_note", note=po.get('suppliernote') or ''))
+
+        # ----- Items (read‑only table, shown straight from the cached frame)
+        table = _card_table(poid)
+        if table is not None:
+            df, order, col_cfg = table, TABLE_COLUMNS, None
+            if st.checkbox(_("show_pictures"), key=f"pics_{poid}"):
+                thumbs = get_item_thumbnails(zip(table["ItemID"], table["PictureVersion"]))
+                df = table.assign(Picture=[thumbs.get(i) for i in table["ItemID"]])
+                order = ("Picture",) + TABLE_COLUMNS
+                col_cfg = {"Picture": st.column_config.ImageColumn(_("picture_col"))}
+            st.dataframe(df, column_order=order, column_config=col_cfg)
+        else:
+            st.info(_("no_items_found_po"))
+
+        # ==================================================================
+        #                          PENDING ACTIONS
+        # ==================================================================
+        if po["status"] == "Pending":
+            c1, c2, c3 = st.columns(3)
+
+            # ---------------- Accept Order ----------------
+            with c1:
+                if not st.session_state["accept_po_show_exp"].get(poid):
+                    if st.button(_("accept_order_btn"), key=f"accept_{poid}"):
+                        st.session_state["accept_po_show_exp"][poid] = True
+                        _rerun_card()
+                else:
+                    st.subheader(_("enter_expiration"))
+                    with st.form(key=f"acc_form_{poid}"):
+                        grid = _item_grid(poid, table, "acc") if table is not None else None
                         d_date = st.date_input(_("final_delivery_date"), key=f"acc_date_{poid}")
                         d_time = st.time_input(_("final_delivery_time"), key=f"acc_time_{poid}")
+                        confirmed = st.form_submit_button(_("confirm_accept"))
+
+                    if confirmed:
+                        # changed dates + lines that have none stored yet
+                        changes = grid_changes(
+                            *grid, ("Expiration",),
+                            force={"Expiration": table["SupExpDate"].isna()},
+                        ) if grid else []
+                        written = update_po_item_proposals(
+                            poid, changes, "Accepted",
+                            expected_delivery=datetime.datetime.combine(d_date, d_time),
+                        )
+                        st.toast(_("po_accepted_msg"))
+                        st.session_state["accept_po_show_exp"][poid] = False
+                        _refresh_card(poid, *written)
+
+            # ---------------- Modify Order ----------------
+            with c2:
+                if not st.session_state["modify_po_show_form"].get(poid):
+                    if st.button(_("modify_order_btn"), key=f"modify_{poid}"):
+                        st.session_state["modify_po_show_form"][poid] = True
+                        _rerun_card()
+                else:
+                    st.subheader(_("propose_changes_header"))
 
-                        if st.button(_("confirm_accept"), key=f"acc_confirm_{poid}"):
-                            for iid, exp in exp_dates.items():
-                                update_po_item_proposal(poid, iid, None, None, exp)
-                            update_purchase_order_status(
-                                poid, "Accepted",
-                                expected_delivery=datetime.datetime.combine(d_date, d_time)
-                            )
-                            st.success(_("po_accepted_msg"))
-                            st.session_state["accept_po_show_exp"][poid] = False
-                            st.rerun()
-
-                # ---------------- Modify Order ----------------
-                with c2:
-                    if not st.session_state["modify_po_show_form"].get(poid):
-                        if st.button(_("modify_order_btn"), key=f"modify_{poid}"):
-                            st.session_state["modify_po_show_form"][poid] = True
-                            st.rerun()
-                    else:
-                        st.subheader(_("propose_changes_header"))
-
-                        def_date, def_time = None, datetime.time(0, 0)
-                        if isinstance(po.get("expecteddelivery"), datetime.datetime):
-                            def_date = po["expecteddelivery"].date()
-                            def_time = po["expecteddelivery"].time()
-
-                        with st.form(key=f"mod_form_{poid}"):
-                            p_date = st.date_input(_("proposed_delivery_date"),
-                                                   value=def_date,
-                                                   key=f"mod_pdate_{poid}")
-                            p_time = st.time_input(_("proposed_delivery_time"),
-                                                   value=def_time,
-                                                   key=f"mod_ptime_{poid}")
-                            p_note = st.text_area(_("supplier_note_label"),
-                                                  value=po.get("suppliernote") or "",
-                                                  key=f"mod_pnote_{poid}")
+                    def_date, def_time = None, datetime.time(0, 0)
+                    if isinstance(po.get("expecteddelivery"), datetime.datetime):
+                        def_date = po["expecteddelivery"].date()
+                        def_time = po["expecteddelivery"].time()
 
+                    with st.form(key=f"mod_form_{poid}"):
+                        p_date = st.date_input(_("proposed_delivery_date"),
+                                               value=def_date,
+                                               key=f"mod_pdate_{poid}")
+                        p_time = st.time_input(_("proposed_delivery_time"),
+                                               value=def_time,
+                                               key=f"mod_ptime_{poid}")
+                        p_note = st.text_area(_("supplier_note_label"),
+                                              value=po.get("suppliernote") or "",
+                                              key=f"mod_pnote_{poid}")
+
+                        upload = st.file_uploader(_("bulk_upload_label"), type="csv",
+                                                  help=_("bulk_upload_help"),
+                                                  key=f"mod_csv_{poid}")
+                        grid = None
+                        if table is not None:
                             st.write(_("item_level_changes"))
-                            item_changes = {}
-                            for it in items:
-                                iid = it["itemid"]
-                                base_qty   = it.get("supproposedquantity") or it["orderedquantity"]
-                                base_price = it.get("supproposedprice")    or (it["estimatedprice"] or 0)
-                                base_exp   = it.get("supexpirationdate")  or datetime.date.today()
-
-                                st.write(_("item_label", id=iid, name=it['itemnameenglish']))
-                                cs1, cs2, cs3 = st.columns(3)
-                                qty_in = cs1.number_input(_("qty_label"), min_value=0,
-                                                          value=int(base_qty),
-                                                          key=f"mod_qty_{poid}_{iid}")
-                                prc_in = cs2.number_input(_("price_label"), min_value=0.0,
-                                                          value=float(base_price),
-                                                          step=0.1,
-                                                          key=f"mod_prc_{poid}_{iid}")
-                                exp_in = cs3.date_input(_("expiration_label"),
-                                                        value=base_exp,
-                                                        key=f"mod_exp_{poid}_{iid}")
-                                item_changes[iid] = (qty_in, prc_in, exp_in)
-                                st.write("---")
-
-                            if st.form_submit_button(_("submit_propose_btn")):
-                                for iid, (q, p, e) in item_changes.items():
-                                    update_po_item_proposal(poid, iid, q, p, e)
-
-                                propose_entire_po(
+                            grid = _item_grid(poid, table, "mod")
+
+                        if st.form_submit_button(_("submit_propose_btn")):
+                            deliver = datetime.datetime.combine(p_date, p_time)
+                            if upload is not None and table is not None:
+                                written = _apply_upload(poid, table, upload, deliver, p_note)
+                            else:
+                                written = update_po_item_proposals(
                                     poid,
-                                    sup_proposed_deliver=datetime.datetime.combine(p_date, p_time),
+                                    grid_changes(*grid) if grid else [],   # edited cells only
+                                    sup_proposed_deliver=deliver,
                                     supplier_note=p_note,
                                 )
-                                st.success(_("proposal_sent"))
+                                st.toast(_("proposal_sent"))
+                            if written:
                                 st.session_state["modify_po_show_form"][poid] = False
-                                st.rerun()
-
-                # ---------------- Decline Order ----------------
-                with c3:
-                    if not st.session_state["decline_po_show_reason"].get(poid):
-                        if st.button(_("decline_order_btn"), key=f"decl_{poid}"):
-                            st.session_state["decline_po_show_reason"][poid] = True
-                            st.rerun()
-                    else:
-                        dec_reason = st.text_area(_("reason_label"), key=f"dec_note_{poid}")
-                        d1, d2 = st.columns(2)
-                        with d1:
-                            if st.button(_("confirm_decline"), key=f"dec_ok_{poid}"):
-                                update_purchase_order_status(poid, "Declined",
-                                                             supplier_note=dec_reason)
-                                st.warning(_("order_declined_msg"))
-                                st.session_state["decline_po_show_reason"][poid] = False
-                                st.rerun()
-                        with d2:
-                            if st.button(_("cancel_btn"), key=f"dec_cancel_{poid}"):
-                                st.session_state["decline_po_show_reason"][poid] = False
-                                st.rerun()
-
-            # ---------------- Post‑pending buttons ----------------
-            elif po["status"] == "Accepted":
-                if st.button(_("mark_shipping_btn"), key=f"ship_{poid}"):
-                    update_purchase_order_status(poid, "Shipping")
-                    st.info(_("order_marked_shipping")); st.rerun()
-
-            elif po["status"] == "Shipping":
-                if st.button(_("mark_delivered_btn"), key=f"deliv_{poid}"):
-                    update_purchase_order_status(poid, "Delivered")
-                    st.success(_("order_marked_delivered")); st.rerun()
+                                _refresh_card(poid, *written)
+
+                    if table is not None:
+                        st.download_button(_("bulk_template_btn"), data=template_csv(table),
+                                           file_name=f"po_{poid}_proposal.csv",
+                                           mime="text/csv", on_click="ignore",
+                                           key=f"mod_tpl_{poid}")
+
+            # ---------------- Decline Order ----------------
+            with c3:
+                if not st.session_state["decline_po_show_reason"].get(poid):
+                    if st.button(_("decline_order_btn"), key=f"decl_{poid}"):
+                        st.session_state["decline_po_show_reason"][poid] = True
+                        _rerun_card()
+                else:
+                    dec_reason = st.text_area(_("reason_label"), key=f"dec_note_{poid}")
+                    d1, d2 = st.columns(2)
+                    with d1:
+                        if st.button(_("confirm_decline"), key=f"dec_ok_{poid}"):
+                            po = update_purchase_order_status(poid, "Declined",
+                                                              supplier_note=dec_reason)
+                            st.toast(_("order_declined_msg"))
+                            st.session_state["decline_po_show_reason"][poid] = False
+                            _refresh_card(poid, po)
+                    with d2:
+                        if st.button(_("cancel_btn"), key=f"dec_cancel_{poid}"):
+                            st.session_state["decline_po_show_reason"][poid] = False
+                            _rerun_card()
+
+        # ---------------- Post‑pending buttons ----------------
+        elif po["status"] == "Accepted":
+            if st.button(_("mark_shipping_btn"), key=f"ship_{poid}"):
+                po = update_purchase_order_status(poid, "Shipping")
+                st.toast(_("order_marked_shipping")); _refresh_card(poid, po)
+
+        elif po["status"] == "Shipping":
+            if st.button(_("mark_delivered_btn"), key=f"deliv_{poid}"):
+                po = update_purchase_order_status(poid, "Delivered")
+                st.toast(_("order_marked_delivered")); _refresh_card(poid, po)
@@ -6,7 +6,7 @@ Active page highlighted with a light-blue bar.  All labels translated via `trans
 
 import streamlit as st
 from supplier.supplier_handler import get_missing_fields
-from purchase_order.po_handler import get_purchase_orders_for_supplier
+from purchase_order.po_handler import get_po_status_summary
 from translation import _, set_language, get_language
 
 STATE_KEY = "nav_page"          # stores "home" | "pos" | "dash"
@@ -64,10 +64,11 @@ def _supplier_card(sup: dict):
     if get_missing_fields(sup):
         st.warning(_("profile_incomplete"), icon="⚠️")
 
-def _pending_pos(supplier_id: int) -> int:
+def _pending_pos(supplier_id: int, summary=None) -> int:
+    """`summary` – optional Future of `get_po_status_summary`, already running."""
     try:
-        rows = get_purchase_orders_for_supplier(supplier_id)
-        return sum(po["status"] == "Pending" for po in rows)
+        summary = summary.result() if summary else get_po_status_summary(supplier_id)
+        return summary.get("Pending", {}).get("count", 0)
     except Exception:
         return 0
 
@@ -84,7 +85,8 @@ def _nav_block(label: str, target_code: str):
 # ───────────────────────────────────────────────────────────────
 # Public API
 # ───────────────────────────────────────────────────────────────
-def render_sidebar(supplier: dict) -> str:
+def render_sidebar(supplier: dict, po_summary=None) -> str:
+    """`po_summary` – Future of the PO status summary, started by the caller."""
     _inject_css()
 
     # first run default page
@@ -102,7 +104,7 @@ def render_sidebar(supplier: dict) -> str:
         # ---- Navigation buttons ----
         _nav_block(_("nav_home"), "home")
 
-        pending = _pending_pos(supplier["supplierid"])
+        pending = _pending_pos(supplier["supplierid"], po_summary)
         po_label = f"{_('nav_pos')} ({pending})" if pending else _("nav_pos")
         _nav_block(po_label, "pos")
 
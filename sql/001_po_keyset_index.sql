@@ -0,0 +1,4 @@
+-- Keyset pagination for the Archived PO page
+-- (po_handler.get_archived_po_page: WHERE SupplierID = … ORDER BY OrderDate DESC, POID DESC)
+CREATE INDEX IF NOT EXISTS idx_po_supplier_orderdate
+    ON PurchaseOrders (SupplierID, OrderDate DESC, POID DESC);
@@ -0,0 +1,5 @@
+-- One supplier row per login e-mail; lets supplier_handler.get_or_create_supplier
+-- bootstrap with INSERT … ON CONFLICT (contactemail) DO NOTHING in one round trip.
+-- Merge any existing duplicates before running this.
+CREATE UNIQUE INDEX IF NOT EXISTS uq_supplier_contactemail
+    ON supplier (contactemail);
@@ -0,0 +1,55 @@
+-- Live PO updates: every committed change to PurchaseOrders / PurchaseOrderItems
+-- sends NOTIFY po_changes '{"s": SupplierID, "p": POID, "x": txid}' – one per
+-- changed PO.  "x" is the writing transaction (po_handler writers return it too,
+-- so the session that wrote can ignore its own echo).
+-- Picked up by purchase_order/po_events.py (one LISTEN connection per process).
+-- Statement-level triggers with transition tables, so a 500-line UPDATE costs
+-- one DISTINCT + one notification instead of 500 trigger calls.
+-- Needs PostgreSQL 10+.
+
+CREATE OR REPLACE FUNCTION notify_po_change() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify('po_changes',
+                      json_build_object('s', c.SupplierID, 'p', c.POID,
+                                        'x', txid_current())::text)
+    FROM (SELECT DISTINCT SupplierID, POID FROM changed_rows) AS c;
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION notify_po_item_change() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify('po_changes',
+                      json_build_object('s', po.SupplierID, 'p', po.POID,
+                                        'x', txid_current())::text)
+    FROM (SELECT DISTINCT POID FROM changed_rows) AS c
+    JOIN PurchaseOrders po ON po.POID = c.POID;
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS po_notify_ins ON PurchaseOrders;
+DROP TRIGGER IF EXISTS po_notify_upd ON PurchaseOrders;
+DROP TRIGGER IF EXISTS po_notify_del ON PurchaseOrders;
+CREATE TRIGGER po_notify_ins AFTER INSERT ON PurchaseOrders
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_po_change();
+CREATE TRIGGER po_notify_upd AFTER UPDATE ON PurchaseOrders
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_po_change();
+CREATE TRIGGER po_notify_del AFTER DELETE ON PurchaseOrders
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_po_change();
+
+DROP TRIGGER IF EXISTS poi_notify_ins ON PurchaseOrderItems;
+DROP TRIGGER IF EXISTS poi_notify_upd ON PurchaseOrderItems;
+DROP TRIGGER IF EXISTS poi_notify_del ON PurchaseOrderItems;
+CREATE TRIGGER poi_notify_ins AFTER INSERT ON PurchaseOrderItems
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_po_item_change();
+CREATE TRIGGER poi_notify_upd AFTER UPDATE ON PurchaseOrderItems
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_po_item_change();
+CREATE TRIGGER poi_notify_del AFTER DELETE ON PurchaseOrderItems
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_po_item_change();
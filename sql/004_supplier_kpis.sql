@@ -0,0 +1,71 @@
+-- Supplier performance KPIs, one precomputed row per supplier.
+-- Kept current incrementally by the po_handler status writers: each PO UPDATE
+-- folds its status transition into this row in the same statement (see
+-- po_handler._po_update), so the dashboard reads one row instead of
+-- aggregating PurchaseOrders.  refresh_supplier_kpis() rebuilds every row
+-- from PurchaseOrders (run below once; again after bulk imports / repairs, or
+-- status changes made outside the app's writers, e.g. buyer-side Completed).
+-- Both paths use the same definitions (status sets mirrored in po_handler):
+--   response  – left Pending for Accepted/Shipping/Delivered/Completed,
+--               'Proposed by Supplier', 'Declined' or 'Declined by Supplier'
+--   accepted  – a response into Accepted/Shipping/Delivered/Completed
+--   delivered – reached Delivered or Completed; late if RespondedAt (the
+--               delivery mark) is after ExpectedDelivery
+-- DEPLOY PREREQUISITE: the status writers upsert into this table in the same
+-- statement, so apply this file before (or with) the app version using it.
+
+CREATE TABLE IF NOT EXISTS supplier_po_kpis (
+    SupplierID       INT PRIMARY KEY REFERENCES supplier (supplierid),
+    Responses        INT NOT NULL DEFAULT 0,   -- Pending → Accepted / Proposed / Declined
+    Accepted         INT NOT NULL DEFAULT 0,
+    Proposed         INT NOT NULL DEFAULT 0,   -- 'Proposed by Supplier'
+    Declined         INT NOT NULL DEFAULT 0,
+    TimedResponses   INT NOT NULL DEFAULT 0,   -- first responses, time known
+    ResponseSeconds  DOUBLE PRECISION NOT NULL DEFAULT 0,  -- Σ RespondedAt − OrderDate
+    Delivered        INT NOT NULL DEFAULT 0,
+    DeliveredLate    INT NOT NULL DEFAULT 0,   -- marked delivered after ExpectedDelivery
+    UpdatedAt        TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Rebuild from the current PO state.  Best effort for old rows: RespondedAt
+-- is overwritten by later status changes, so response times only come from
+-- POs still in their response status.
+CREATE OR REPLACE FUNCTION refresh_supplier_kpis() RETURNS void
+LANGUAGE sql AS $$
+    INSERT INTO supplier_po_kpis AS k
+           (SupplierID, Responses, Accepted, Proposed, Declined,
+            TimedResponses, ResponseSeconds, Delivered, DeliveredLate, UpdatedAt)
+    SELECT SupplierID,
+           COUNT(*) FILTER (WHERE Status IN ('Accepted', 'Shipping', 'Delivered', 'Completed',
+                                             'Proposed by Supplier',
+                                             'Declined', 'Declined by Supplier')),
+           COUNT(*) FILTER (WHERE Status IN ('Accepted', 'Shipping', 'Delivered', 'Completed')),
+           COUNT(*) FILTER (WHERE Status = 'Proposed by Supplier'),
+           COUNT(*) FILTER (WHERE Status IN ('Declined', 'Declined by Supplier')),
+           COUNT(*) FILTER (WHERE Status IN ('Accepted', 'Proposed by Supplier',
+                                             'Declined', 'Declined by Supplier')
+                              AND RespondedAt IS NOT NULL),
+           COALESCE(SUM(EXTRACT(EPOCH FROM RespondedAt - OrderDate))
+                    FILTER (WHERE Status IN ('Accepted', 'Proposed by Supplier',
+                                             'Declined', 'Declined by Supplier')
+                              AND RespondedAt IS NOT NULL), 0),
+           COUNT(*) FILTER (WHERE Status IN ('Delivered', 'Completed')),
+           COUNT(*) FILTER (WHERE Status IN ('Delivered', 'Completed')
+                              AND RespondedAt > ExpectedDelivery),
+           NOW()
+    FROM PurchaseOrders
+    WHERE SupplierID IN (SELECT supplierid FROM supplier)
+    GROUP BY SupplierID
+    ON CONFLICT (SupplierID) DO UPDATE SET
+        Responses       = EXCLUDED.Responses,
+        Accepted        = EXCLUDED.Accepted,
+        Proposed        = EXCLUDED.Proposed,
+        Declined        = EXCLUDED.Declined,
+        TimedResponses  = EXCLUDED.TimedResponses,
+        ResponseSeconds = EXCLUDED.ResponseSeconds,
+        Delivered       = EXCLUDED.Delivered,
+        DeliveredLate   = EXCLUDED.DeliveredLate,
+        UpdatedAt       = EXCLUDED.UpdatedAt;
+$$;
+
+SELECT refresh_supplier_kpis();
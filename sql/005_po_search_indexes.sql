@@ -0,0 +1,15 @@
+-- Search box of the Archived PO page (po_handler._search_clause): word-prefix
+-- full-text matches on item names and supplier notes, plus exact POID.
+-- 'simple' config – no stemming / stop words, so names in any language and
+-- item codes match as typed.  The expressions must stay identical to the
+-- ones in the query for the planner to use these indexes.
+
+CREATE INDEX IF NOT EXISTS idx_item_name_fts
+    ON Item USING GIN (to_tsvector('simple', ItemNameEnglish));
+
+CREATE INDEX IF NOT EXISTS idx_po_note_fts
+    ON PurchaseOrders USING GIN (to_tsvector('simple', SupplierNote));
+
+-- matching items → their PO lines (the PK leads with POID)
+CREATE INDEX IF NOT EXISTS idx_poi_item
+    ON PurchaseOrderItems (ItemID, POID);
@@ -7,12 +7,29 @@ import streamlit as st
 from translation import _
 from supplier.supplier_handler import (
     SUPPLIER_FIELDS,
+    get_or_create_supplier,
     get_missing_fields,
     get_supplier_form_structure,
     save_supplier_details,
-    list_cities_for_country,
+    get_city_index,
+    get_supplier_kpis,
+    search_cities,
 )
 
+SUPPLIER_STATE = "supplier_row"     # session cache of the signed-in supplier
+
+# ───────────────────────────────────────────────────────────────
+def current_supplier(email: str) -> dict:
+    """
+    Supplier row for this session: bootstrapped once (single upsert round
+    trip), then served from session state until a profile save replaces it.
+    """
+    row = st.session_state.get(SUPPLIER_STATE)
+    if row is None or row["contactemail"] != email:
+        row = get_or_create_supplier(email)
+        st.session_state[SUPPLIER_STATE] = row
+    return row
+
 # ───────────────────────────────────────────────────────────────
 def show_supplier_dashboard(supplier: dict):
     st.subheader(_("nav_dash"))
@@ -21,6 +38,8 @@ def show_supplier_dashboard(supplier: dict):
     st.markdown(_("welcome_user", name=name))
     st.markdown(_("supplier_id", id=supplier['supplierid']))
 
+    _kpi_panel(supplier["supplierid"])
+
     missing = get_missing_fields(supplier)
     if missing:
         _profile_form(supplier, _("complete_profile"),
@@ -29,29 +48,53 @@ def show_supplier_dashboard(supplier: dict):
         with st.expander(_("edit_profile")):
             _profile_form(supplier, None, missing_only=False)
 
+# ───────────────────────────────────────────────────────────────
+def _kpi_panel(supplierid: int):
+    """Performance metrics from the supplier's precomputed KPI row."""
+    kpis = get_supplier_kpis(supplierid)
+    st.markdown(f"**{_('kpi_header')}**")
+    if not kpis or not (kpis["responses"] or kpis["delivered"]):
+        st.caption(_("kpi_none"))
+        return
+
+    def pct(rate):
+        return "–" if rate is None else f"{rate:.0%}"
+
+    hours = kpis["avg_response_hours"]
+    if hours is None:
+        response = "–"
+    elif hours < 48:
+        response = _("kpi_hours", n=f"{hours:.1f}")
+    else:
+        response = _("kpi_days", n=f"{hours / 24:.1f}")
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric(_("kpi_acceptance"), pct(kpis["acceptance_rate"]))
+    c2.metric(_("kpi_response_time"), response)
+    c3.metric(_("kpi_on_time"), pct(kpis["on_time_rate"]))
+    c4.metric(_("kpi_proposals"), pct(kpis["proposal_rate"]))
+    st.caption(_("kpi_basis", responses=kpis["responses"],
+                 delivered=kpis["delivered"]))
+
 # ───────────────────────────────────────────────────────────────
 def _profile_form(supplier, title, missing_only, missing_fields=None):
     schema = get_supplier_form_structure()
     if title:
         st.info(title)
 
+    # Country + city live outside the form so the city typeahead reacts
+    # while typing (widgets inside a form only report on submit).
+    show_city = not missing_only or "city" in (missing_fields or [])
+    _location_picker(supplier, schema, show_city)
+
     with st.form("supplier_profile_form", clear_on_submit=False):
-        data = {}
-
-        # ----- Country first (needed for dependent city) -----
-        country_options = schema["country"]["options"]
-        pre_country = supplier.get("country", "")
-        # Default to "Iraq" when the DB value is empty/NULL
-        default_country = pre_country or "Iraq"
-        data["country"] = st.selectbox(
-            _(schema["country"]["label"]),
-            country_options,
-            index=_safe_index(country_options, default_country),
-        )
+        data = {"country": st.session_state["sup_country"]}
+        if show_city:
+            data["city"] = st.session_state.get("sup_city_value", "")
 
         # ----- Remaining fields -----
         for key, label in SUPPLIER_FIELDS.items():
-            if key == "country":
+            if key in ("country", "city"):
                 continue
             if missing_only and key not in (missing_fields or []):
                 continue
@@ -60,15 +103,7 @@ def _profile_form(supplier, title, missing_only, missing_fields=None):
             current = supplier.get(key, "")
 
             display_label = _(label)
-            if meta["type"] == "dynamic_select":  # City
-                options = list_cities_for_country(data["country"])
-                if options:
-                    data[key] = st.selectbox(display_label, options,
-                                             index=_safe_index(options, current))
-                else:
-                    data[key] = st.text_input(display_label, value=current)
-
-            elif meta["type"] == "select":
+            if meta["type"] == "select":
                 options = [_(opt) for opt in meta["options"]]
                 data[key] = st.selectbox(display_label, options,
                                          index=_safe_index(options, current))
@@ -78,10 +113,48 @@ def _profile_form(supplier, title, missing_only, missing_fields=None):
                 data[key] = st.text_input(display_label, value=current)
 
         if st.form_submit_button(_("save")):
-            save_supplier_details(supplier["supplierid"], data)
+            row = save_supplier_details(supplier["supplierid"], data)
+            if row:                    # refresh the session copy from RETURNING
+                st.session_state[SUPPLIER_STATE] = row
             st.success(_("profile_updated"))
             st.rerun()
 
+@st.fragment
+def _location_picker(supplier, schema, show_city):
+    """Country select + prefix typeahead over the cached city index."""
+    # ----- Country first (needed for dependent city) -----
+    country_options = schema["country"]["options"]
+    pre_country = supplier.get("country", "")
+    # Default to "Iraq" when the DB value is empty/NULL
+    default_country = pre_country or "Iraq"
+    country = st.selectbox(
+        _(schema["country"]["label"]),
+        country_options,
+        index=_safe_index(country_options, default_country),
+        key="sup_country",
+    )
+    if not show_city:
+        return
+
+    current = supplier.get("city", "")
+    index = get_city_index(country)
+    if not index:                      # no city data → free text
+        st.session_state["sup_city_value"] = st.text_input(
+            _("City"), value=current, key=f"sup_city_txt_{country}")
+        return
+
+    prefix = st.text_input(_("city_search"), key=f"sup_city_q_{country}")
+    options = search_cities(country, prefix)
+    if current in index and current not in options and not prefix:
+        options = [current] + options
+    if not options:
+        st.caption(_("no_city_match"))
+        st.session_state["sup_city_value"] = current   # Save keeps the stored city
+        return
+    st.session_state["sup_city_value"] = st.selectbox(
+        _("City"), options, index=_safe_index(options, current),
+        key=f"sup_city_sel_{country}")
+
 def _safe_index(options, value):
     """Return options.index(value) or 0 if value not present."""
     try:
@@ -3,12 +3,33 @@ supplier/supplier_handler.py
 Business-logic helpers for Supplier profile CRUD + country/city look-ups.
 """
 
-from typing import Dict, List
-import pycountry
+import bisect
+from functools import lru_cache
+from typing import Dict, List, Tuple
 import psycopg2       # for error inspection
-from db_handler import get_db
+from db_handler import LazyDatabase, statement
 
-db = get_db()         # cached DatabaseManager singleton
+db = LazyDatabase()   # DatabaseManager singleton, built on first query
+
+# hot statements – PREPAREd once per pooled connection (db_handler.Statement)
+_CITIES_BY_COUNTRY = statement(
+    "cities_by_country", "SELECT city FROM cities WHERE country = %s")
+_SUPPLIER_BY_EMAIL = statement(
+    "supplier_by_email", "SELECT * FROM supplier WHERE contactemail = %s")
+_GET_OR_CREATE_SUPPLIER = statement("supplier_get_or_create", """
+        WITH ins AS (
+            INSERT INTO supplier (suppliername, contactemail)
+            VALUES (%s, %s)
+            ON CONFLICT (contactemail) DO NOTHING
+            RETURNING *
+        )
+        SELECT * FROM ins
+        UNION ALL
+        SELECT * FROM supplier WHERE contactemail = %s
+        LIMIT 1
+""")
+_SUPPLIER_KPIS = statement(
+    "supplier_kpis", "SELECT * FROM supplier_po_kpis WHERE SupplierID = %s")
 
 # ───────────────────────────────────────────────────────────────
 # Static label map
@@ -29,32 +50,80 @@ SUPPLIER_FIELDS: Dict[str, str] = {
 # ───────────────────────────────────────────────────────────────
 # Country / city helpers
 # ───────────────────────────────────────────────────────────────
+CITY_CACHE_COUNTRIES = 32     # per-country city indexes kept in memory
+CITY_MATCH_LIMIT = 50         # typeahead rows sent to the browser
+
+@lru_cache(maxsize=1)
+def _sorted_countries() -> Tuple[str, ...]:
+    import pycountry                   # ~250 records; load only when needed
+    return tuple(sorted(c.name for c in pycountry.countries))
+
 def list_all_countries() -> List[str]:
-    """Return ≈250 ISO country names, alphabetically."""
-    return sorted(c.name for c in pycountry.countries)
+    """Return ≈250 ISO country names, alphabetically (sorted once)."""
+    return list(_sorted_countries())
 
-def list_cities_for_country(country: str) -> List[str]:
+class CityIndex:
+    """Sorted city names + case-folded keys for O(log n) prefix lookups."""
+
+    def __init__(self, cities):
+        pairs = sorted((c.casefold(), c) for c in cities if c)
+        self._keys = [k for k, _ in pairs]
+        self.cities = [c for _, c in pairs]
+
+    def __len__(self) -> int:
+        return len(self.cities)
+
+    def __contains__(self, city) -> bool:
+        i = bisect.bisect_left(self._keys, (city or "").casefold())
+        return i < len(self._keys) and self.cities[i] == city
+
+    def search(self, prefix: str, limit: int = CITY_MATCH_LIMIT) -> List[str]:
+        key = (prefix or "").strip().casefold()
+        lo = bisect.bisect_left(self._keys, key)
+        out = []
+        for i in range(lo, min(lo + limit, len(self._keys))):
+            if not self._keys[i].startswith(key):
+                break
+            out.append(self.cities[i])
+        return out
+
+@lru_cache(maxsize=CITY_CACHE_COUNTRIES)
+def _city_index(country: str) -> CityIndex:
+    # errors propagate, so lru_cache never stores a failed lookup
+    rows = db.fetch(_CITIES_BY_COUNTRY, (country,))
+    return CityIndex(r["city"] for r in rows)
+
+def get_city_index(country: str) -> CityIndex:
     """
-    Fetch city names from helper table `cities`.  
-    If the table doesn't exist (or the country has no rows) → return [].
+    Cached prefix index of a country's cities (LRU over countries).
+    If the table doesn't exist (or the country has no rows) → empty index.
     """
-    q = "SELECT city FROM cities WHERE country = %s ORDER BY city"
     try:
-        rows = db.fetch(q, (country,))
-        return [r["city"] for r in rows] if rows else []
+        return _city_index(country)
     except psycopg2.errors.UndefinedTable:
         # first run: table hasn't been created yet ⇒ silently ignore
-        return []
+        return CityIndex(())
     except Exception:
         # any other DB issue ⇒ degrade gracefully
-        return []
+        return CityIndex(())
+
+def list_cities_for_country(country: str) -> List[str]:
+    """
+    City names from helper table `cities`, alphabetically.
+    If the table doesn't exist (or the country has no rows) → return [].
+    """
+    return list(get_city_index(country).cities)
+
+def search_cities(country: str, prefix: str,
+                  limit: int = CITY_MATCH_LIMIT) -> List[str]:
+    """Typeahead: at most `limit` cities of `country` starting with `prefix`."""
+    return get_city_index(country).search(prefix, limit)
 
 # ───────────────────────────────────────────────────────────────
 # CRUD helpers
 # ───────────────────────────────────────────────────────────────
 def get_supplier_by_email(email: str) -> Dict | None:
-    q = "SELECT * FROM supplier WHERE contactemail = %s"
-    return db.fetch_one(q, (email,))
+    return db.fetch_one(_SUPPLIER_BY_EMAIL, (email,), cache_tags=("supplier",))
 
 def create_supplier(contactemail: str) -> Dict:
     q = """
@@ -65,21 +134,62 @@ def create_supplier(contactemail: str) -> Dict:
     return db.execute(q, ("", contactemail), returning=True)
 
 def get_or_create_supplier(contactemail: str) -> Dict:
-    return get_supplier_by_email(contactemail) or create_supplier(contactemail)
+    """
+    Bootstrap in ONE round trip: insert-if-absent and return the row.
+    Relies on the unique index from sql/002_supplier_email_unique.sql, so
+    two tabs signing in at once can't create duplicate suppliers.
+    """
+    params = ("", contactemail, contactemail)
+    # a concurrent insert committed after our snapshot is invisible to
+    # both branches – the retry sees it
+    return (db.execute(_GET_OR_CREATE_SUPPLIER, params, returning=True)
+            or db.execute(_GET_OR_CREATE_SUPPLIER, params, returning=True))
 
 def get_missing_fields(row: Dict) -> List[str]:
     return [k for k in SUPPLIER_FIELDS if not row.get(k)]
 
+# ───────────────────────────────────────────────────────────────
+# Performance KPIs (precomputed – sql/004_supplier_kpis.sql)
+# ───────────────────────────────────────────────────────────────
+def _rate(part, whole):
+    return part / whole if whole else None
+
+def get_supplier_kpis(supplierid: int) -> Dict | None:
+    """
+    The supplier's KPI row – one indexed read, kept current by the PO
+    status writers (po_handler._po_update) – plus the derived figures:
+    acceptance_rate / proposal_rate (of responses), on_time_rate (of
+    deliveries), each 0–1, and avg_response_hours.  A figure is None while
+    there is nothing to base it on; no row (or no table yet) → None.
+    """
+    try:
+        row = db.fetch_one(_SUPPLIER_KPIS, (supplierid,),
+                           cache_tags=("supplier_po_kpis",))
+    except psycopg2.errors.UndefinedTable:
+        return None                    # migration not applied yet
+    if not row:
+        return None
+    kpis = dict(row)
+    kpis["acceptance_rate"] = _rate(row["accepted"], row["responses"])
+    kpis["proposal_rate"]   = _rate(row["proposed"], row["responses"])
+    kpis["on_time_rate"]    = _rate(row["delivered"] - row["deliveredlate"],
+                                    row["delivered"])
+    secs = _rate(row["responseseconds"], row["timedresponses"])
+    kpis["avg_response_hours"] = None if secs is None else secs / 3600
+    return kpis
+
 # ───────────────────────────────────────────────────────────────
 # Form schema for Streamlit UI
 # ───────────────────────────────────────────────────────────────
+@lru_cache(maxsize=1)
 def get_supplier_form_structure() -> Dict[str, Dict]:
+    """Built once per process – treat the returned dict as read-only."""
     return {
         "suppliertype": {"label": "Supplier Type", "type": "select",
                          "options": ["Manufacturer", "Distributor",
                                      "Retailer", "Other"]},
         "country":      {"label": "Country", "type": "select",
-                         "options": list_all_countries()},
+                         "options": _sorted_countries()},
         "city":         {"label": "City",    "type": "dynamic_select"},
         "address":      {"label": "Address", "type": "text"},
         "postalcode":   {"label": "Postal Code", "type": "text"},
@@ -95,13 +205,15 @@ get_form_structure = get_supplier_form_structure
 # ───────────────────────────────────────────────────────────────
 # Update helper
 # ───────────────────────────────────────────────────────────────
-def save_supplier_details(supplierid: int, data: Dict):
+def save_supplier_details(supplierid: int, data: Dict) -> Dict | None:
+    """Write the profile and return the updated row (RETURNING *)."""
     q = """
         UPDATE supplier
         SET suppliername = %s, suppliertype = %s, country = %s, city = %s,
             address = %s, postalcode = %s, contactname = %s, contactphone = %s,
             paymentterms = %s, bankdetails = %s
         WHERE supplierid = %s
+        RETURNING *
     """
     params = (
         data.get("suppliername", ""), data.get("suppliertype", ""),
@@ -111,4 +223,4 @@ def save_supplier_details(supplierid: int, data: Dict):
         data.get("paymentterms", ""), data.get("bankdetails", ""),
         supplierid,
     )
-    db.execute(q, params)
+    return db.execute(q, params, returning=True)
@@ -0,0 +1,60 @@
+"""
+template_csv → parse_proposal_csv round trip: an unchanged template must
+upload cleanly whatever dtypes po_handler.get_item_tables produced.
+"""
+
+import datetime
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from purchase_order.proposal_upload import parse_proposal_csv, template_csv
+
+def _table(sup_qty, sup_price, sup_exp):
+    """Item table of a PO with one proposed and two unproposed lines."""
+    return pd.DataFrame({
+        "ItemID":     [11, 12, 13],
+        "Item Name":  ["Oil", "Tea", "Flour, 5 kg"],
+        "OrderedQty": pd.array([4, 7, 9], dtype="Int64"),
+        "EstPrice":   [Decimal("1.50"), None, Decimal("3")],
+        "SupQty":     sup_qty,
+        "SupPrice":   sup_price,
+        "SupExpDate": sup_exp,
+    })
+
+def _rows(buf):
+    return [line.split("\t") for line in buf.getvalue().splitlines()]
+
+EXPECTED = [
+    ["11", "5", "2.25", "2027-03-01"],      # proposed values win
+    ["12", "7", "\\N", "\\N"],              # ordered qty, no price / date
+    ["13", "9", "3.00", "\\N"],             # ordered qty + estimated price
+]
+
+@pytest.mark.parametrize("sup_qty, sup_price, sup_exp", [
+    # plain fetch_df of a nullable column: float64 / NaN, objects / None
+    (np.array([5.0, np.nan, np.nan]),
+     [Decimal("2.25"), None, None],
+     [datetime.date(2027, 3, 1), None, None]),
+    # nullable dtypes (ITEM_TABLE_DTYPES), NaN prices, datetime64 dates
+    (pd.array([5, None, None], dtype="Int64"),
+     [2.25, np.nan, np.nan],
+     pd.to_datetime(["2027-03-01", None, None])),
+], ids=["float-nan", "nullable"])
+def test_template_round_trip(sup_qty, sup_price, sup_exp):
+    table = _table(sup_qty, sup_price, sup_exp)
+    buf, count, errors = parse_proposal_csv(template_csv(table), {11, 12, 13})
+    assert errors == []
+    assert count == 3
+    assert _rows(buf) == EXPECTED
+
+def test_template_header_and_values():
+    table = _table(np.array([5.0, np.nan, np.nan]),
+                   [Decimal("2.25"), None, None],
+                   [datetime.date(2027, 3, 1), None, None])
+    lines = template_csv(table).decode("utf-8-sig").splitlines()
+    assert lines[0] == "ItemID,Item Name,qty,price,expiration"
+    assert lines[1] == "11,Oil,5,2.25,2027-03-01"
+    assert lines[3] == '13,"Flour, 5 kg",9,3.00,'
@@ -1,17 +1,58 @@
 # translation/__init__.py
 import json
 import pathlib
+import string
+import threading
+import time
+from types import MappingProxyType
 import streamlit as st
 
 TRANSL_DIR = pathlib.Path(__file__).parent
 DEFAULT_LANG = "en"
 SESSION_KEY = "lang"
+RELOAD_CHECK_INTERVAL = 2.0       # seconds between mtime checks (hot reload)
 
-# --- load dictionaries once per session ---
-@st.cache_resource(show_spinner=False)
-def _load_dict(lang: str) -> dict:
+# --- RTL language codes: read once at import ---
+RTL_LANGS = frozenset((TRANSL_DIR / "rtl_langs.txt").read_text().split())
+
+# --- compiled catalogs: lang → read-only {key: str | bound str.format} ---
+_catalogs: dict = {}
+_mtimes: dict = {}
+_next_check = 0.0
+_reload_lock = threading.Lock()
+_formatter = string.Formatter()
+
+def _compile(raw: dict) -> MappingProxyType:
+    """
+    Pre-parse every template once: strings without replacement fields are
+    stored as-is (returned without calling format); the rest are stored as
+    their bound `str.format`.
+    """
+    table = {}
+    for key, text in raw.items():
+        has_fields = any(field is not None for _, field, _, _ in _formatter.parse(text))
+        table[key] = text.format if has_fields else text
+    return MappingProxyType(table)
+
+def _load_catalog(lang: str) -> MappingProxyType:
     file = TRANSL_DIR / f"{lang}.json"
-    return json.loads(file.read_text(encoding="utf8"))
+    with _reload_lock:
+        mtime = file.stat().st_mtime
+        if _mtimes.get(lang) != mtime or lang not in _catalogs:
+            _catalogs[lang] = _compile(json.loads(file.read_text(encoding="utf8")))
+            _mtimes[lang] = mtime
+        return _catalogs[lang]
+
+def _catalog(lang: str) -> MappingProxyType:
+    """Compiled catalog; re-stats the JSON files at most every few seconds."""
+    global _next_check
+    now = time.monotonic()
+    if now >= _next_check:
+        _next_check = now + RELOAD_CHECK_INTERVAL
+        for loaded in list(_catalogs):
+            _load_catalog(loaded)
+    cat = _catalogs.get(lang)
+    return cat if cat is not None else _load_catalog(lang)
 
 def set_language(lang_code: str):
     st.session_state[SESSION_KEY] = lang_code
@@ -21,12 +62,11 @@ def get_language() -> str:
 
 def _(key: str, **fmt) -> str:
     """Translate key using current language (fallback → key)."""
-    lang = get_language()
-    dictionary = _load_dict(lang)
-    text = dictionary.get(key, key)
-    return text.format(**fmt)
+    entry = _catalog(get_language()).get(key, key)
+    if entry.__class__ is str:         # plain text – nothing to format
+        return entry
+    return entry(**fmt)
 
 def is_rtl() -> bool:
-    """Optional: read rtl_langs.txt to decide page direction."""
-    rtl_codes = (TRANSL_DIR / "rtl_langs.txt").read_text().split()
-    return get_language() in rtl_codes
+    """Optional: rtl_langs.txt decides page direction."""
+    return get_language() in RTL_LANGS